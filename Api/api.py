@@ -1,21 +1,39 @@
 # main.py
 import os
-import pdfplumber
-import io
 import sqlite3, re, json, uuid
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from google.cloud import storage
 from google.api_core import exceptions
 
-from google.adk.runners import Runner
-from google.adk.sessions import DatabaseSessionService
 from google.genai.types import Content, Part
 from typing import List
 from rootagent.agent import root_agent
 from dotenv import load_dotenv
+from subagents.tools.env_settings import env_number
 from subagents.tools.inv_parser_tool import extract_invoice_data_from_text,parse_bank_statement_text
-from subagents.tools.database_tools import save_invoice_data,save_bank_transactions_tool
+from subagents.tools.database_tools import (
+    save_bank_transactions_queued, save_invoices_queued, save_bank_transaction_columns_queued, invoice_row,
+    bank_transactions_result_message, invoice_result_message
+)
+from subagents.tools.write_queue import get_write_queue
+from subagents.tools.pdf_extractor_pool import get_extraction_pool, join_page_text, parse_bank_statement_pages, ExtractionQueueFull, ExtractionTimeout
+from subagents.tools.extraction_cache import extract_pdf_cached
+from subagents.tools.upload_buffer import UploadBuffer
+from subagents.tools.llm_cache import get_llm_cache
+from subagents.tools.migrations import migrate_databases
+from subagents.tools.db_connections import get_connection_manager, close_connection_manager
+from subagents.tools.run_reports import (
+    save_run_report, load_run_report, backfill_run_reports, all_run_reports_json, run_request_key, find_completed_run
+)
+from subagents.tools.reconciliation_engine import load_audit_report, reconcile_transactions
+from subagents.tools.agent_runtime import start_agent_runtime, get_agent_runtime, stop_agent_runtime
+from subagents.tools.run_jobs import get_run_job_manager, RunJob, RunQueueFull, COMPLETED
+from subagents.tools.list_queries import fetch_page, iter_rows, decode_cursor, validate_filters, page_size
 import json
 import re
 # --- Configuration ---
@@ -26,16 +44,60 @@ load_dotenv()
 BANK_STATEMENT_BUCKET = os.getenv("BANK_STATEMENT_BUCKET")
 INVOICE_BUCKET = os.getenv("SOURCE_BUCKET") # New variable for the invoice bucket
 GCP_CREDENTIALS_PATH = os.getenv("gcp_credentials_path")
+# Maximum number of files of a batch upload that are processed at the same time
+BATCH_UPLOAD_CONCURRENCY = env_number("BATCH_UPLOAD_CONCURRENCY", 8)
+# Returned (as a 422) for a bank statement that matches no registered layout, instead of
+# ingesting it as an empty statement.
+UNRECOGNIZED_LAYOUT_ERROR = ("Unrecognized statement layout: no transactions could be parsed. "
+                             "Register a layout for this bank with register_layout.")
+# Transactions written per database round trip when a statement is ingested with stream=true
+BANK_STATEMENT_CHUNK_SIZE = env_number("BANK_STATEMENT_CHUNK_SIZE", 1000)
+# Uploads larger than this are spooled to a temp file instead of being held in memory
+UPLOAD_SPOOL_MAX_BYTES = env_number("UPLOAD_SPOOL_MAX_BYTES", 8 * 1024 * 1024)
 
 # --- Initialization ---
+# GCS client calls are blocking, so uploads run on this thread pool instead of the event loop
+gcs_executor = ThreadPoolExecutor(
+    max_workers=env_number("GCS_UPLOAD_THREADS", 16), thread_name_prefix="gcs-upload"
+)
+_gcs_buckets = {}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The session store and Runner are built once and shared by every run; building the session
+    # service also creates ADK's tables, so sessions.db is migrated after it.
+    await start_agent_runtime(root_agent)
+    # Bring database.db and sessions.db up to the current schema before serving requests.
+    migrate_databases()
+    get_connection_manager()
+    # Upload writes are group-committed by one background task.
+    await get_write_queue().start()
+    # Reconciliation runs are executed in the background by a fixed number of workers.
+    await get_run_job_manager().start()
+    # Reports of runs completed before run_reports existed are filled in without delaying startup.
+    backfill = asyncio.create_task(asyncio.to_thread(backfill_run_reports))
+    yield
+    try:
+        await backfill
+    except Exception as e:
+        print(f"Run report backfill failed: {e}")
+    await get_run_job_manager().stop()
+    await get_write_queue().stop()
+    await stop_agent_runtime()
+    close_connection_manager()
+    # Stop the PDF extraction worker processes and upload threads together with the server.
+    get_extraction_pool().shutdown()
+    gcs_executor.shutdown(wait=False)
+
 # Initialize FastAPI app with a more descriptive title
-app = FastAPI(title="Multi-Bucket PDF Upload Service")
+app = FastAPI(title="Multi-Bucket PDF Upload Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allow all origins
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # the next-page cursor of the list endpoints
 )
 # Initialize Google Cloud Storage client
 storage_client = None
@@ -76,11 +138,10 @@ def extract_json_from_response(text: str) -> dict:
     except json.JSONDecodeError as e:
         raise ValueError(f"Failed to parse extracted JSON: {e}\n\nExtracted string was:\n{json_string}")
     
-async def _upload_file_to_gcs(file: UploadFile, bucket_name: str):
+def _check_upload_target(file: UploadFile, bucket_name: str):
     """
-    A helper function to upload a file to a specified GCS bucket.
+    Pre-flight checks shared by the upload endpoints.
     """
-    # 1. Pre-flight checks
     if not storage_client:
         raise HTTPException(
             status_code=500,
@@ -97,24 +158,44 @@ async def _upload_file_to_gcs(file: UploadFile, bucket_name: str):
             detail=f"Invalid file type. Only PDFs are accepted. Received: {file.content_type}"
         )
 
-    try:
-        # 2. Get the GCS bucket
+
+def _get_gcs_bucket(bucket_name: str):
+    """Looks a bucket up once and reuses the handle for later uploads."""
+    bucket = _gcs_buckets.get(bucket_name)
+    if bucket is None:
         bucket = storage_client.get_bucket(bucket_name)
+        _gcs_buckets[bucket_name] = bucket
+    return bucket
 
-        # 3. Create a new blob (GCS object)
-        blob = bucket.blob(file.filename)
-        
-        # 4. Read the file and upload it
-        contents = await file.read()
-        blob.upload_from_string(contents, content_type=file.content_type)
 
-        # 5. Return success response
-        return {
-            "message": f"File '{file.filename}' uploaded successfully to bucket '{bucket_name}'.",
-            "filename": file.filename,
-            "gcs_path": f"gs://{bucket_name}/{blob.name}",
-            "public_url": blob.public_url
-        }
+def _upload_buffer_to_gcs(buffer: UploadBuffer, bucket_name: str) -> dict:
+    """
+    Blocking GCS upload; always called on `gcs_executor`, never on the event loop.
+    """
+    # 1. Get the GCS bucket
+    bucket = _get_gcs_bucket(bucket_name)
+
+    # 2. Create a new blob (GCS object) and upload the buffered content
+    blob = bucket.blob(buffer.filename)
+    buffer.upload_to_blob(blob)
+
+    # 3. Return success response
+    return {
+        "message": f"File '{buffer.filename}' uploaded successfully to bucket '{bucket_name}'.",
+        "filename": buffer.filename,
+        "gcs_path": f"gs://{bucket_name}/{blob.name}",
+        "public_url": blob.public_url
+    }
+
+
+async def _upload_to_gcs(buffer: UploadBuffer, bucket_name: str) -> dict:
+    """
+    A helper function to upload a buffered file to a specified GCS bucket
+    without blocking the event loop.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(gcs_executor, _upload_buffer_to_gcs, buffer, bucket_name)
     except exceptions.NotFound:
         raise HTTPException(
             status_code=404,
@@ -134,41 +215,62 @@ async def _upload_file_to_gcs(file: UploadFile, bucket_name: str):
 #     """
 #     return await _upload_file_to_gcs(file=file, bucket_name=BANK_STATEMENT_BUCKET)
 @app.post("/api/upload/bank-statement", tags=["Bank Statements"])
-async def upload_bank_statement(file: UploadFile = File(...)):
+async def upload_bank_statement(file: UploadFile = File(...), stream: bool = False):
     """
     Accepts a bank statement PDF, uploads it to GCS, extracts all transactions,
     and saves them to the database.
+
+    With `stream=true` the statement is parsed page by page into compact columns and saved
+    in bounded chunks, which keeps memory low for very large statements; the response then carries
+    transaction counts instead of the transaction list.
+
+    A statement that matches no registered layout is answered with a 422 and nothing is saved;
+    the uploaded file stays in GCS.
     """
-    # 1. Read file content and reset stream for re-reading
-    content_bytes = await file.read()
-    await file.seek(0)
-    
-    # 2. Upload the original PDF to the designated bank statement bucket
-    upload_result = await _upload_file_to_gcs(file=file, bucket_name=BANK_STATEMENT_BUCKET)
-    
-    # 3. Extract all text from the PDF content
-    raw_text = extract_text_from_pdf_bytes(content_bytes)
-    if not raw_text:
+    # 1. Validate the request and buffer the file content once
+    _check_upload_target(file, BANK_STATEMENT_BUCKET)
+    buffer = await UploadBuffer.from_upload(file, UPLOAD_SPOOL_MAX_BYTES)
+    try:
+        if stream:
+            # The pool worker only parses; the columns it returns are saved here, through the
+            # write queue, once the upload has succeeded.
+            upload_result, column_batches = await _upload_and_extract(
+                buffer, BANK_STATEMENT_BUCKET,
+                lambda upload: _await_extraction(get_extraction_pool().run(parse_bank_statement_pages, upload.source))
+            )
+            if column_batches and not any(columns.layout for columns in column_batches):
+                raise HTTPException(status_code=422, detail=UNRECOGNIZED_LAYOUT_ERROR)
+            db_result = await save_bank_transaction_columns_queued(column_batches, BANK_STATEMENT_CHUNK_SIZE)
+            if not db_result["success"]:
+                print(f"WARNING: File uploaded, but DB save failed: {db_result['error']}")
+            return {
+                "message": "Bank statement uploaded and processed successfully.",
+                "gcs_details": upload_result,
+                "transactions_processed": db_result["processed"],
+                "transactions_saved": db_result["inserted"],
+                "transactions_ignored": db_result["ignored"]
+            }
+
+        # 2. Upload the original PDF to the bank statement bucket while the
+        #    transactions are extracted and parsed
+        upload_result, transactions = await _upload_and_extract(buffer, BANK_STATEMENT_BUCKET, _parse_bank_statement)
+    finally:
+        buffer.close()
+
+    # 3. Save the transactions now that the upload has succeeded
+    if transactions:
+        await _save_bank_transactions(transactions)
+    elif transactions is not None:
+        print(f"WARNING: No transactions found in {file.filename}, skipping database save.")
+
+    if transactions is None:
         return {
             "message": "File uploaded to GCS, but no text could be extracted for processing.",
             "gcs_details": upload_result,
             "extracted_transactions": None
         }
 
-    # 4. Parse the text using the bank statement parser
-    parsed_data = parse_bank_statement_text(raw_text)
-
-    # 5. Save the extracted transactions to the database
-    transactions = parsed_data.get("transactions", [])
-    if transactions:
-        db_result = save_bank_transactions_tool(parsed_data) # Pass the whole dict
-        if "error" in db_result.lower():
-            # Log the error but don't fail the request
-            print(f"WARNING: File uploaded, but DB save failed: {db_result}")
-    else:
-        print(f"WARNING: No transactions found in {file.filename}, skipping database save.")
-
-    # 6. Return a comprehensive response
+    # 4. Return a comprehensive response
     return {
         "message": "Bank statement uploaded and processed successfully.",
         "gcs_details": upload_result,
@@ -176,16 +278,66 @@ async def upload_bank_statement(file: UploadFile = File(...)):
     }
 
 
+async def _parse_bank_statement(buffer: UploadBuffer) -> list | None:
+    """
+    Extracts and parses the transactions of one bank statement.
+    Returns the transactions, or None when the PDF has no extractable text.
+    A statement that matches no registered layout is rejected with a 422.
+    """
+    # 1. Extract all text from the PDF content
+    raw_text = await extract_text_from_upload(buffer, include_tables=False)
+    if not raw_text:
+        return None
+
+    # 2. Parse the text using the bank statement parser, off the event loop
+    parsed = await asyncio.to_thread(parse_bank_statement_text, raw_text)
+    if parsed["layout"] is None:
+        raise HTTPException(status_code=422, detail=UNRECOGNIZED_LAYOUT_ERROR)
+    return parsed["transactions"]
+
+
+async def _save_bank_transactions(transactions: list):
+    db_result = bank_transactions_result_message(await save_bank_transactions_queued(transactions))
+    if "error" in db_result.lower():
+        # Log the error but don't fail the request
+        print(f"WARNING: File uploaded, but DB save failed: {db_result}")
+
+
+async def _upload_and_extract(buffer: UploadBuffer, bucket_name: str, extract):
+    """
+    Uploads the buffered PDF to GCS while `extract(buffer)` reads it, and waits for BOTH to
+    finish before returning, so neither outlives the request or the buffer it reads.
+
+    Partial failures are handled the same way by every upload endpoint: nothing is saved to
+    the database unless both succeeded. A failed upload fails the request. A failed extraction
+    also fails the request, and the uploaded file stays in GCS, as with the sequential flow.
+    """
+    outcomes = await asyncio.gather(_upload_to_gcs(buffer, bucket_name), extract(buffer), return_exceptions=True)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    return outcomes
+
+
+async def _await_extraction(awaitable):
+    """Awaits a job on the extraction pool, translating pool back-pressure into HTTP errors."""
+    try:
+        return await awaitable
+    except ExtractionQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ExtractionTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
 
-def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
-    """Helper function to extract text from PDF content in memory."""
-    full_text = ""
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                full_text += page_text + "\n"
-    return full_text.strip()
+async def extract_text_from_upload(buffer: UploadBuffer, include_tables: bool = True) -> str:
+    """
+    Helper function to extract text from an uploaded PDF.
+    The pdfplumber work runs on the shared process pool so it never blocks the event loop,
+    and the result is cached by content hash for the later pipeline tools. Invoices also get
+    their tables extracted for the DataExtractorAgent; bank statements only need the text.
+    """
+    extracted = await _await_extraction(extract_pdf_cached(buffer.source, buffer.sha256, include_tables))
+    return join_page_text(extracted["pages"])
 
 
 @app.post("/api/upload/invoice", tags=["Invoices"])
@@ -194,36 +346,34 @@ async def upload_invoice(file: UploadFile = File(...)):
     Accepts an invoice PDF, uploads it to GCS, extracts key fields using a 
     deterministic Python parser, and saves them to the database.
     """
-    # 1. Read file content into memory ONCE. This is for text extraction.
-    content_bytes = await file.read()
-    
-    
-    await file.seek(0)
-    
-   
-    upload_result = await _upload_file_to_gcs(file=file, bucket_name=INVOICE_BUCKET)
+    # 1. Validate the request and buffer the file content once
+    _check_upload_target(file, INVOICE_BUCKET)
+    buffer = await UploadBuffer.from_upload(file, UPLOAD_SPOOL_MAX_BYTES)
 
-    # 4. Extract text from the content we read into memory earlier.
-    raw_text = extract_text_from_pdf_bytes(content_bytes)
-    if not raw_text:
+    # 2. Upload the original PDF to the invoice bucket while the fields are
+    #    extracted and parsed
+    try:
+        upload_result, extracted_data = await _upload_and_extract(buffer, INVOICE_BUCKET, _parse_invoice)
+    finally:
+        buffer.close()
+
+    # 3. Save the extracted data now that the upload has succeeded, if an invoice number was found
+    if extracted_data is not None:
+        if extracted_data.get("invoice_number"):
+            db_result = invoice_result_message(extracted_data, await save_invoices_queued([extracted_data]))
+            if "error" in db_result.lower():
+                print(f"WARNING: File uploaded, but DB save failed: {db_result}")
+        else:
+            print(f"WARNING: No invoice number found in {file.filename}, skipping database save.")
+
+    if extracted_data is None:
         return {
             "message": "File uploaded to GCS, but no text could be extracted for processing.",
             "gcs_details": upload_result,
             "extracted_data": None
         }
 
-    # 5. Parse the text using the deterministic Python function.
-    extracted_data = extract_invoice_data_from_text(raw_text)
-
-    # 6. Save the extracted data to the database if an invoice number was found.
-    if extracted_data.get("invoice_number"):
-        db_result = save_invoice_data(extracted_data)
-        if "error" in db_result.lower():
-            print(f"WARNING: File uploaded, but DB save failed: {db_result}")
-    else:
-        print(f"WARNING: No invoice number found in {file.filename}, skipping database save.")
-
-    # 7. Return a comprehensive response.
+    # 4. Return a comprehensive response.
     return {
         "message": "Invoice uploaded and processed successfully.",
         "gcs_details": upload_result,
@@ -231,6 +381,137 @@ async def upload_invoice(file: UploadFile = File(...)):
     }
 
 
+async def _parse_invoice(buffer: UploadBuffer) -> dict | None:
+    """
+    Extracts and parses the key fields of one invoice.
+    Returns the extracted fields, or None when the PDF has no extractable text.
+    """
+    # 1. Extract text from the PDF content.
+    raw_text = await extract_text_from_upload(buffer)
+    if not raw_text:
+        return None
+
+    # 2. Parse the text using the deterministic Python function, off the event loop.
+    return await asyncio.to_thread(extract_invoice_data_from_text, raw_text)
+
+
+async def _ingest_batch_file(file: UploadFile, bucket_name: str, parser, semaphore: asyncio.Semaphore,
+                             include_tables: bool = True) -> dict:
+    """
+    Uploads, extracts and parses one file of a batch upload. Errors are captured in
+    the returned result instead of raised, so one bad file does not fail the batch.
+    """
+    async with semaphore:
+        result = {"filename": file.filename, "success": False, "error": None,
+                  "gcs_details": None, "extracted_data": None}
+        buffer = None
+        try:
+            _check_upload_target(file, bucket_name)
+            buffer = await UploadBuffer.from_upload(file, UPLOAD_SPOOL_MAX_BYTES)
+            result["gcs_details"], raw_text = await _upload_and_extract(
+                buffer, bucket_name, lambda buffer: extract_text_from_upload(buffer, include_tables)
+            )
+            if not raw_text:
+                result["error"] = "File uploaded to GCS, but no text could be extracted for processing."
+                return result
+
+            result["extracted_data"] = await asyncio.to_thread(parser, raw_text)
+            result["success"] = True
+        except HTTPException as e:
+            result["error"] = e.detail
+        except Exception as e:
+            result["error"] = f"An unexpected error occurred while processing the file: {str(e)}"
+        finally:
+            if buffer:
+                buffer.close()
+        return result
+
+
+@app.post("/api/upload/invoices", tags=["Invoices"])
+async def upload_invoices_batch(files: List[UploadFile] = File(...)):
+    """
+    Accepts many invoice PDFs in one request. Files are uploaded and parsed concurrently
+    (at most BATCH_UPLOAD_CONCURRENCY at a time) and the extracted invoices of the whole
+    batch are saved in a single write queue request, committed together. Returns one result per file.
+    """
+    semaphore = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
+    results = await asyncio.gather(*[
+        _ingest_batch_file(file, INVOICE_BUCKET, extract_invoice_data_from_text, semaphore)
+        for file in files
+    ])
+
+    to_save = []
+    for r in results:
+        if not r["success"]:
+            continue
+        if r["extracted_data"].get("invoice_number"):
+            to_save.append(r)
+        else:
+            r["db_result"] = "No invoice number found, skipping database save."
+
+    if to_save:
+        db_result = await save_invoices_queued([r["extracted_data"] for r in to_save])
+        for r in to_save:
+            r["db_result"] = invoice_result_message(r["extracted_data"], _batch_file_result(
+                db_result, saved=invoice_row(r["extracted_data"]) is not None
+            ))
+
+    return {
+        "message": f"Processed {len(results)} invoices, {sum(r['success'] for r in results)} succeeded.",
+        "results": results
+    }
+
+
+@app.post("/api/upload/bank-statements", tags=["Bank Statements"])
+async def upload_bank_statements_batch(files: List[UploadFile] = File(...)):
+    """
+    Accepts many bank statement PDFs in one request. Files are uploaded and parsed
+    concurrently (at most BATCH_UPLOAD_CONCURRENCY at a time) and the extracted transactions
+    of the whole batch are saved in a single write queue request, committed together.
+    Returns one result per file, plus the batch's database result.
+    """
+    semaphore = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
+    results = await asyncio.gather(*[
+        _ingest_batch_file(file, BANK_STATEMENT_BUCKET, parse_bank_statement_text, semaphore, include_tables=False)
+        for file in files
+    ])
+
+    to_save = []
+    for r in results:
+        if r["success"] and r["extracted_data"]["layout"] is None:
+            r["success"], r["error"] = False, UNRECOGNIZED_LAYOUT_ERROR
+        if not r["success"]:
+            continue
+        if r["extracted_data"].get("transactions"):
+            to_save.append(r)
+        else:
+            r["db_result"] = "No transactions found, skipping database save."
+
+    batch_db_result = None
+    if to_save:
+        db_result = await save_bank_transactions_queued(
+            [transaction for r in to_save for transaction in r["extracted_data"]["transactions"]]
+        )
+        batch_db_result = bank_transactions_result_message(db_result)
+        for r in to_save:
+            # New and duplicate rows are only counted for the batch as a whole.
+            r["db_result"] = (f"{len(r['extracted_data']['transactions'])} transactions included in the batch save, "
+                              "see db_result for the batch totals."
+                              if db_result["success"] else batch_db_result)
+
+    return {
+        "message": f"Processed {len(results)} bank statements, {sum(r['success'] for r in results)} succeeded.",
+        "db_result": batch_db_result,
+        "results": results
+    }
+
+
+def _batch_file_result(db_result: dict, saved: bool) -> dict:
+    """The status dictionary of one file's invoice within a batch saved in a single request."""
+    return {"success": db_result["success"], "processed": 1, "inserted": int(saved and db_result["success"]),
+            "ignored": int(not saved), "error": db_result["error"]}
+
+
 # @app.post("/api/run")
 # async def run_reconciliation_agent():
 #     try:
@@ -273,19 +554,44 @@ async def upload_invoice(file: UploadFile = File(...)):
 #         )
 
 def get_db_connection():
-    """Opens a new database connection and closes it when done."""
+    """Lends a pooled read-only connection for the request; rows behave like dictionaries."""
     try:
-        DATABASE_PATH = os.getenv("DB_PATH", "database.db")
-        conn = sqlite3.connect(DATABASE_PATH)
-        # This makes the results behave like dictionaries (e.g., row['column_name'])
-        conn.row_factory = sqlite3.Row 
-        yield conn
+        with get_connection_manager().read() as conn:
+            yield conn
     except sqlite3.Error as e:
         # If the database file can't be opened, raise an HTTP exception.
         raise HTTPException(status_code=500, detail=f"Database connection error: {e}")
-    finally:
-        if 'conn' in locals() and conn:
-            conn.close()
+
+
+def _save_run_session(run_id: str, session_id: str, request_key: tuple = None):
+    """
+    Records the run's session and stores its audit report, read from `reconciliation_results`.
+    Returns the report, or None when the agent never reconciled under `run_id`.
+    """
+    with get_connection_manager().write() as conn:
+        audit_report = load_audit_report(conn, run_id)
+        if audit_report is None:
+            return None
+        conn.execute("INSERT INTO runsessions VALUES (?,?)", (run_id, session_id))
+        save_run_report(conn, run_id, session_id, audit_report, request_key)
+    return audit_report
+
+
+def _lookup_run_request(start_date: str, end_date: str) -> tuple:
+    """The request key of a date range on the current data, and the stored run made for it, if any."""
+    with get_connection_manager().read() as conn:
+        request_key = run_request_key(conn, start_date, end_date)
+        return request_key, find_completed_run(conn, request_key)
+
+
+def _run_accepted(run_id: str, status: str, coalesced: bool) -> dict:
+    return {
+        "run_id": run_id,
+        "status": status,
+        "coalesced": coalesced,
+        "status_url": f"/api/run/{run_id}",
+        "events_url": f"/api/run/{run_id}/events",
+    }
 
 
 
@@ -297,71 +603,127 @@ class ReconciliationRequest(BaseModel):
     start_date: str
     end_date: str
 
-@app.post("/api/run")
+async def execute_reconciliation_run(job: RunJob) -> dict:
+    """
+    Reconciles the job's date range under its run ID, then runs the agent pipeline, which
+    emails the saved report and summarizes it, reporting its progress on the job.
+    """
+    # --- Reconcile first, so the results never depend on what the model passes back ---
+    reconciled = await reconcile_transactions(job.start_date, job.end_date, job.run_id)
+    if not reconciled["success"]:
+        raise ValueError(f"Reconciliation of run {job.run_id} failed: {reconciled['error']}")
+
+    runtime = get_agent_runtime()
+    session = await runtime.create_session()
+
+    # --- Create a dynamic message for the agent ---
+    prompt_text = (
+        f"Run the Reconciliation pipeline for transactions with a transaction_date "
+        f"between {job.start_date} and {job.end_date}. The reconciliation has already been run "
+        f"under run_id {job.run_id}; its summary is {json.dumps(reconciled['data'])}."
+    )
+    content = Content(role='user', parts=[Part(text=prompt_text)])
+
+    events = runtime.run_async(session.id, content)
+
+    full_response_text = "No final response was received from the agent."
+    async for event in events:
+        job.record_adk_event(event)
+        if event.is_final_response():
+            if event.content and event.content.parts:
+                full_response_text = "".join(part.text for part in event.content.parts)
+            else:
+                full_response_text = "Final response event had no content."
+            break
+      # === THIS IS THE CRITICAL DEBUGGING STEP ===
+    print("**********************************************")
+    print("****** AGENT'S RAW RESPONSE (PRE-PARSING) ******")
+    print(full_response_text)
+    print("**********************************************")
+    # ===============================================
+
+    # The agent only summarizes; the report is the one saved under the run ID above.
+    audit_report = await asyncio.to_thread(_save_run_session, job.run_id, session.id, job.key)
+    if audit_report is None:
+        raise ValueError(f"No reconciliation results were saved for run {job.run_id}.")
+
+    return {"audit_report": audit_report}
+
+
+@app.post("/api/run", status_code=202)
 async def run_reconciliation_agent(request: ReconciliationRequest): # <-- 1. Accept the request body
+    """
+    Queues a reconciliation run for the date range and returns its run_id immediately.
+    Follow it with GET /api/run/{run_id} (status and, once completed, the result)
+    or GET /api/run/{run_id}/events (progress as server-sent events).
+
+    A request for the same date range while the data is unchanged does not start another run:
+    it gets the run_id of the queued, running or completed one, with `coalesced` set.
+    """
+    # --- 2. Validate the date range ---
     try:
-        # --- 2. Validate the date range ---
-        try:
-            start = date.fromisoformat(request.start_date)
-            end = date.fromisoformat(request.end_date)
-            if start > end:
-                raise HTTPException(status_code=400, detail="start_date cannot be after end_date.")
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Please use YYYY-MM-DD.")
-
-        APP_NAME = "reconciliation"
-        USER_ID = "user1"
-        session_service = DatabaseSessionService(db_url="sqlite:///C:/Users/Yaswanth/Invoice_Validation_and_Reconciliation_Agent/sessions.db")
-        runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
-        session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID)
-        
-        # --- 3. Create a dynamic message for the agent ---
-        prompt_text = (
-            f"Run the Reconciliation pipeline for transactions with a transaction_date "
-            f"between {request.start_date} and {request.end_date}."
-        )
-        content = Content(role='user', parts=[Part(text=prompt_text)])
-        
-        events = runner.run_async(user_id=USER_ID, session_id=session.id, new_message=content)
-
-        full_response_text = "No final response was received from the agent."
-        async for event in events:
-            if event.is_final_response():
-                if event.content and event.content.parts:
-                    full_response_text = "".join(part.text for part in event.content.parts)
-                else:
-                    full_response_text = "Final response event had no content."
-                break
-          # === THIS IS THE CRITICAL DEBUGGING STEP ===
-        print("**********************************************")
-        print("****** AGENT'S RAW RESPONSE (PRE-PARSING) ******")
-        print(full_response_text)
-        print("**********************************************")
-        # ===============================================
-        
-        try:
-            clean_json_response = extract_json_from_response(full_response_text)
-        except ValueError as e:
-            raise HTTPException(status_code=500, detail=f"Could not parse JSON from agent response. Error: {e}")
-        
-        db_path = os.getenv("DB_PATH")
-        run_id = str(uuid.uuid4())
+        start = date.fromisoformat(request.start_date)
+        end = date.fromisoformat(request.end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Please use YYYY-MM-DD.")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date cannot be after end_date.")
+
+    # --- 3. Attach to an identical run (same normalized range, unchanged data) if there is one ---
+    start_date, end_date = start.isoformat(), end.isoformat()
+    request_key, completed_run_id = await asyncio.to_thread(_lookup_run_request, start_date, end_date)
+    # From here on nothing awaits, so no other request can queue the same key in between.
+    manager = get_run_job_manager()
+    job = manager.find(request_key)
+    if job is not None:
+        return _run_accepted(job.run_id, job.status, coalesced=True)
+    if completed_run_id is not None:
+        return _run_accepted(completed_run_id, COMPLETED, coalesced=True)
+
+    # --- 4. Queue the run ---
+    run_id = str(uuid.uuid4())
+    try:
+        job = manager.submit(run_id, start_date, end_date, execute_reconciliation_run, key=request_key)
+    except RunQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
 
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO runsessions VALUES (?,?)",(run_id, session.id))
+    return _run_accepted(job.run_id, job.status, coalesced=False)
 
-        return clean_json_response
 
-    except Exception as e:
-        # Re-raise HTTPExceptions, handle others
-        if isinstance(e, HTTPException):
-            raise e
-        raise HTTPException(
-            status_code=500,
-            detail=f"An internal error occurred while running the agent: {str(e)}"
-        )
-    
+@app.get("/api/run/{run_id}")
+def get_run_status(run_id: str):
+    """
+    Status of a run: queued, running (with the current agent and finished stages),
+    completed (with the result) or failed (with the error). Runs finished before the
+    server started are answered from their stored report.
+    """
+    job = get_run_job_manager().get(run_id)
+    if job is not None:
+        return job.snapshot()
+
+    with get_connection_manager().read() as conn:
+        audit_report = load_run_report(conn, run_id)
+    if audit_report is None:
+        raise HTTPException(status_code=404, detail=f"No run found for run ID: {run_id}")
+    return {"run_id": run_id, "status": COMPLETED, "result": {"audit_report": audit_report}}
+
+
+@app.get("/api/run/{run_id}/events")
+def get_run_events(run_id: str, last_event_id: str | None = Header(default=None)):
+    """
+    Progress of a run as server-sent events: `status`, `agent_started`, `tool_call`, `tool_result`,
+    `stage_completed` (with its duration), then `completed` or `failed`. Past events are replayed
+    first; a reconnecting client sends Last-Event-ID to resume after the events it already has.
+    """
+    job = get_run_job_manager().get(run_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No active or recent run found for run ID: {run_id}")
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    return StreamingResponse(
+        job.sse(after), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get(
     "/run-ids",
     response_model=List[str],
@@ -399,159 +761,70 @@ def get_all_run_ids(conn: sqlite3.Connection = Depends(get_db_connection)):
 )
 def get_all_run_reports():
     """
-    Retrieves a list of all runs from the
-    `reconciliation_results` table by executing a raw SQL command.
+    Retrieves the audit report of every completed run from the `run_reports` table.
     """
-    reports = []
-    db1_conn = None
-    db2_conn = None
     try:
-        DB1_PATH = os.getenv("DB_PATH")
-        db1_conn = sqlite3.connect(DB1_PATH)
-        db1_conn.row_factory = sqlite3.Row
-        db1_cursor = db1_conn.cursor()
-
-        # Connection to sessions.db to get event details
-        DB2_PATH = os.getenv("SESSIONS_DB_PATH")
-        db2_conn = sqlite3.connect(DB2_PATH)
-        db2_conn.row_factory = sqlite3.Row
-        db2_cursor = db2_conn.cursor()
-
-        # Get all run_id and session_id pairs
-        db1_cursor.execute("SELECT runID, sessionID FROM runsessions")
-        all_runs = db1_cursor.fetchall()
-        print("all runs :",all_runs)
-
-         # Iterate through each run and find its latest event
-        for run in all_runs:
-            run_id = run['runID']
-            session_id = run['sessionID']
-            print("runid: ", run_id)
-            print("session id: ", session_id)
-
-            query = """
-                SELECT content FROM events
-                WHERE session_id = ?
-                ORDER BY timestamp DESC
-                LIMIT 1
-            """
-            
-            db2_cursor.execute(query, (session_id,))
-            latest_content = db2_cursor.fetchone()
-            print("latest_content :",latest_content)
-
-            content_data = json.loads(latest_content[0])
-            print("content data: ",content_data)
-
-            if content_data:
-                text = json.loads(content_data["parts"][0]["text"])
-                print("text: ",text)
-                audit_reports = text["audit_report"]
-                print("audit reports: ",audit_reports)
-
-                reports.append({
-                "run_id": run_id,
-                "audit_report": audit_reports
-                })
-
-        print("reports: ",reports)
-        return reports
-
+        with get_connection_manager().read() as conn:
+            return Response(content=all_run_reports_json(conn), media_type="application/json")
     except Exception as e:
         return {"error": str(e)}
-        
-    finally:
-        if db1_conn:
-            db1_conn.close()
-        if db2_conn:
-            db2_conn.close()
 
-@app.get("/api/invoices")
-def get_invoices():
+def list_response(name: str, filters: dict, cursor: str | None, limit: int | None, stream: bool):
+    """
+    One keyset page of list `name` as a JSON array, with the cursor of the next page in the
+    X-Next-Cursor header (absent on the last page). With `stream=true` the rows from the cursor
+    on (all of them, or the first `limit`) are streamed as NDJSON while they are read.
+    """
     try:
-        db_path = os.getenv("DB_PATH", "database.db")
-        with sqlite3.connect(db_path) as conn:
-            conn.row_factory = sqlite3.Row
-           
-            cursor = conn.cursor()
-           
-            query = """
-                SELECT
-                    invoice_number,
-                    invoice_date,
-                    due_date,
-                    vendor_name,
-                    client_name,
-                    total_amount
-                FROM
-                    invoices
-            """
-           
-            cursor.execute(query)
-            results = cursor.fetchall()
- 
-            invoices = [dict(row) for row in results]
-           
-            return invoices
- 
-    except sqlite3.Error as e:
-        # Handle potential database errors (e.g., table not found)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database error: {e}"
-        )
-    except Exception as e:
-        # Handle other unexpected errors
-        raise HTTPException(
-            status_code=500,
-            detail=f"An unexpected error occurred: {e}"
-        )
-    
+        filters = validate_filters(filters)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/bank/transactions")
-def get_transactions():
+    manager = get_connection_manager()
     try:
-        db_path = os.getenv("DB_PATH", "database.db")
-        with sqlite3.connect(db_path) as conn:
-            # This makes cursor results accessible by column name (like a dict)
-            conn.row_factory = sqlite3.Row
-           
-            cursor = conn.cursor()
-           
-            # Fetch the most recent transactions first
-            query = """
-                SELECT
-                    transaction_id,
-                    invoice_number,
-                    description,
-                    transaction_date,
-                    debit_amount,
-                    status
-                FROM
-                    bank_transactions
-            """
-           
-            cursor.execute(query)
-            results = cursor.fetchall()
- 
-            # Convert the list of sqlite3.Row objects to a list of dicts
-            # This is necessary for FastAPI to build the Pydantic response model
-            transactions = [dict(row) for row in results]
-           
-            return transactions
- 
+        if stream:
+            lines = (json.dumps(row) + "\n" for row in iter_rows(manager, name, filters, after, limit))
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+
+        with manager.read() as conn:
+            rows, next_cursor = fetch_page(conn, name, filters, after, page_size(limit))
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return Response(content=json.dumps(rows), media_type="application/json", headers=headers)
+
     except sqlite3.Error as e:
         # Handle potential database errors (e.g., table not found)
         raise HTTPException(
             status_code=500,
             detail=f"Database error: {e}"
         )
-    except Exception as e:
-        # Handle other unexpected errors
-        raise HTTPException(
-            status_code=500,
-            detail=f"An unexpected error occurred: {e}"
-        )
+
+
+@app.get("/api/invoices")
+def get_invoices(vendor: str | None = None, start_date: str | None = None, end_date: str | None = None,
+                 invoice_number: str | None = None, cursor: str | None = None, limit: int | None = None,
+                 stream: bool = False):
+    """
+    Invoices in (invoice_date, invoice_number) order, filtered by vendor name, invoice date range
+    and invoice number. Paged with `cursor`/`limit`; see `list_response`.
+    """
+    filters = {"vendor": vendor, "start_date": start_date, "end_date": end_date, "invoice_number": invoice_number}
+    return list_response("invoices", filters, cursor, limit, stream)
+
+
+@app.get("/api/bank/transactions")
+def get_transactions(vendor: str | None = None, start_date: str | None = None, end_date: str | None = None,
+                     invoice_number: str | None = None, status: str | None = None, cursor: str | None = None,
+                     limit: int | None = None, stream: bool = False):
+    """
+    Bank transactions in (transaction_date, transaction_id) order, filtered by the vendor of their
+    invoice, transaction date range, invoice number and status. Paged with `cursor`/`limit`; see `list_response`.
+    """
+    filters = {
+        "vendor": vendor, "start_date": start_date, "end_date": end_date,
+        "invoice_number": invoice_number, "status": status,
+    }
+    return list_response("bank_transactions", filters, cursor, limit, stream)
 
 @app.get("/api/report/{runId}")
 def get_report_by_run_id(runId: str):
@@ -559,10 +832,7 @@ def get_report_by_run_id(runId: str):
     Retrieves all reconciliation results associated with a specific run ID.
     """
     try:
-        # Assumes DB_PATH is set in your .env file
-        db_path = os.getenv("DB_PATH")
-        with sqlite3.connect(db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_connection_manager().read() as conn:
             cursor = conn.cursor()
             
             # Query to fetch all results for the given run_id
@@ -605,6 +875,14 @@ def get_report_by_run_id(runId: str):
             detail=f"An unexpected error occurred: {e}"
         )
 
+@app.get("/api/llm-cache/stats", tags=["Monitoring"])
+def get_llm_cache_stats():
+    """
+    Returns the hit/miss counters of the LLM response cache since the server started,
+    and the number and total size of the cached responses.
+    """
+    return get_llm_cache().stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("api:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,132 @@
+# benchmarks/invoice_parser_benchmark.py
+"""
+Micro-benchmark: the single-pass invoice field extractor in `inv_parser_tool`
+against the original per-field `re.search` implementation, and the memoizing
+date normalizer against the original strptime loop.
+
+Run from the repository root:
+    python -m benchmarks.invoice_parser_benchmark
+"""
+import re
+import json
+import timeit
+from datetime import datetime
+
+from subagents.tools.inv_parser_tool import INVOICE_FIELDS, VARIANT_SEPARATOR, extract_invoice_data_from_text, parse_date
+
+SAMPLE_INVOICE_TEXT = """INVOICE
+Invoice Number: SANYASH/2025/INV002
+Invoice Date: 14-08-2025
+Due Date: 13-09-2025
+Vendor: Vertex Industrial Solutions
+45 IT Park, Sector 62, Noida, Uttar Pradesh - 201301
+PAN: FGHIJ5678K
+GSTIN: 29ABCDE1234F1Z5
+Client: Sanyash Private Limited
+3rd Floor, Tech Park, Whitefield, Bengaluru, Karnataka - 560066
+PRODUCTS
+Product Description Qty Unit Price Total
+Cisco Catalyst Switch 48-port, Layer 2/3 3 ₹120,000 ₹360,000
+Dell UltraSharp 24” Monitor IPS, Full HD 15 ₹18,000 ₹270,000
+APC Smart-UPS 3000VA LCD, sine wave 2 ₹85,000 ₹170,000
+TAX SUMMARY
+Subtotal ₹800,000.00
+CGST (9%) ₹72,000.00
+SGST (9%) ₹72,000.00
+Total Amount ₹944,000.00
+BANK DETAILS
+Bank Name ICICI Bank
+Account Number 987654321098
+IFSC Code ICIC0004567
+Branch Nariman Point, Mumbai
+TERMS & CONDITIONS
+1. Payment due within 30 days from the date of invoice.
+2. Warranty coverage as mentioned for each product.
+3. Goods once sold will not be taken back or exchanged.
+4. Late payments may attract interest charges.
+This is a computer-generated invoice and does not require a physical signature.
+Thank you for your business!"""
+
+
+def legacy_extract_invoice_data_from_text(text: str) -> dict:
+    """The original implementation, kept here only as the benchmark baseline."""
+    data = {
+        "invoice_number": None, "vendor_name": None, "client_name": None,
+        "invoice_date": None, "due_date": None, "total_amount": None,
+    }
+
+    patterns = {
+        "invoice_number": r"(?i)Invoice Number[:\s]+([A-Z0-9-/]+)",
+        "vendor_name":    r"(?i)^Vendor[:\s]+(.*?)\n",
+        "client_name":    r"(?i)^Client[:\s]+(.*?)\n",
+        "invoice_date":   r"(?i)Invoice Date[:\s]+([\d-]+)",
+        "due_date":       r"(?i)Due Date[:\s]+([\d-]+)",
+        "total_amount":   r"(?i)Total Amount\s*₹?\s*([\d,]+\.\d{2})",
+    }
+
+    for key, pattern in patterns.items():
+        match = re.search(pattern, text, re.MULTILINE)
+        if match:
+            raw_value = match.group(1).strip() if match.group(1) else None
+            if not raw_value:
+                continue
+            if "date" in key:
+                data[key] = legacy_parse_date(raw_value)
+            elif "amount" in key:
+                try:
+                    data[key] = float(raw_value.replace(",", ""))
+                except ValueError:
+                    pass
+            else:
+                data[key] = raw_value.strip()
+
+    return data
+
+
+def legacy_parse_date(date_string: str) -> str | None:
+    """The original `parse_date`: one strptime attempt per format until one succeeds."""
+    date_string = date_string.strip()
+    for fmt in ['%d-%m-%Y', '%m-%d-%Y', '%Y-%m-%d', '%b %d, %Y', '%B %d, %Y', '%d %b %Y', '%d %B %Y']:
+        try:
+            return datetime.strptime(date_string, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def legacy_with_variants(text: str) -> dict:
+    """The original approach extended to the same label variants: the canonical label, then the variants."""
+    data = dict.fromkeys(INVOICE_FIELDS)
+    for key, (labels, value_pattern, line_start, convert) in INVOICE_FIELDS.items():
+        prefix = "^" if line_start else ""
+        for pattern in (prefix + re.escape(labels[0]) + value_pattern,
+                        prefix + "(?:" + "|".join(map(re.escape, labels[1:])) + ")" + VARIANT_SEPARATOR + value_pattern):
+            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+            if match and match.group(1).strip():
+                data[key] = convert(match.group(1).strip())
+                break
+    return data
+
+
+def main():
+    legacy = legacy_extract_invoice_data_from_text(SAMPLE_INVOICE_TEXT)
+    current = extract_invoice_data_from_text(SAMPLE_INVOICE_TEXT)
+    assert legacy == current, f"Results differ:\n{json.dumps(legacy)}\n{json.dumps(current)}"
+
+    number = 20000
+    for name, fn in [("legacy (per-field re.search)", legacy_extract_invoice_data_from_text),
+                     ("legacy + label variants", legacy_with_variants),
+                     ("single-pass compiled", extract_invoice_data_from_text)]:
+        seconds = min(timeit.repeat(lambda: fn(SAMPLE_INVOICE_TEXT), number=number, repeat=5))
+        print(f"{name:30s} {number / seconds:10.0f} invoices/s  ({seconds / number * 1e6:.1f} us/invoice)")
+
+    dates = ["14-08-2025", "2025-08-14", "Aug 14, 2025", "12-25-2025"]
+    assert [legacy_parse_date(d) for d in dates] == [parse_date(d) for d in dates]
+    number = 50000
+    for name, fn in [("legacy parse_date", legacy_parse_date), ("date normalizer", parse_date)]:
+        seconds = min(timeit.repeat(lambda: [fn(d) for d in dates], number=number, repeat=5))
+        print(f"{name:30s} {number * len(dates) / seconds:10.0f} dates/s     ({seconds / number / len(dates) * 1e6:.2f} us/date)")
+
+
+if __name__ == "__main__":
+    main()
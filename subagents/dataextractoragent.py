@@ -4,11 +4,12 @@ from google.adk.models.lite_llm import LiteLlm
 from subagents.datanormalizeragent import data_normalizer_agent
 from subagents.prompts.dataextractorprompt import prompt
 from subagents.tools.dataextractortool import list_gcs_invoices, extract_invoice_content, upload_json_to_gcs
+from subagents.tools.invoice_normalizer import normalize_invoice_content
 
 data_extractor_agent = LlmAgent(
     name="DataExtractorAgent",
     description="Accesses the invoices from the cloud and extracts the info into a json object",
     model=LiteLlm("openai/gpt-4o"),
     instruction=prompt,
-    tools=[list_gcs_invoices, extract_invoice_content, AgentTool(agent=data_normalizer_agent), upload_json_to_gcs]
+    tools=[list_gcs_invoices, extract_invoice_content, normalize_invoice_content, AgentTool(agent=data_normalizer_agent), upload_json_to_gcs]
 )
\ No newline at end of file
@@ -1,10 +1,13 @@
 from google.adk.agents import LlmAgent
 from subagents.prompts.datanormalizerprompt import prompt
 from google.adk.models.lite_llm import LiteLlm
+from subagents.tools.llm_cache import llm_cache_before_model, llm_cache_after_model
 
 data_normalizer_agent = LlmAgent(
     name="DataNormalizerAgent",
     description="Normalizes the invoice info into a json object",
     model=LiteLlm("openai/gpt-4o"),
-    instruction=prompt
+    instruction=prompt,
+    before_model_callback=llm_cache_before_model,
+    after_model_callback=llm_cache_after_model
 )
\ No newline at end of file
@@ -5,9 +5,11 @@ Your goal:
 1. Retrieve a list of invoice files stored in the GCS bucket by calling the `list_gcs_invoices` tool.
 2. For each file returned:
     a. Extract its raw content by calling `extract_invoice_content` tool and pass the file name you are corrently processing.
-    b. Send the extracted data to the `data_normalizer_agent` tool to transform it into a clean, structured JSON object.
+    b. Pass the extracted content to the `normalize_invoice_content` tool to transform it into a clean, structured JSON object.
+        - If `needs_llm_review` is false, use its `invoice` object as the structured JSON.
+        - ONLY IF `needs_llm_review` is true (or the tool fails), send the extracted content to the `data_normalizer_agent` tool instead and use the JSON it returns.
     c. Upload the structured JSON to the GCS bucket using `upload_json_to_gcs` tool by passing:
-        - The JSON content EXACTLY as it was returned by `DataNormalizerAgent`, without altering or reordering its keys.
+        - The JSON content EXACTLY as it was returned by `normalize_invoice_content` or `DataNormalizerAgent`, without altering or reordering its keys.
         - The name of the file you are currently processing.
 4. Continue until all invoices have been processed and uploaded.
 5. After all invoices have been processed and uploaded:
@@ -16,5 +18,5 @@ Your goal:
 Behavior rules:
 - Always process invoices sequentially to ensure correct mapping between original files and their JSON output.
 - Use the exact file names as returned from `list_gcs_invoices` without altering them.
-- Preserve the exact key order in the JSON returned from `DataNormalizerAgent`
+- Preserve the exact key order in the JSON returned from `normalize_invoice_content` or `DataNormalizerAgent`
 """
\ No newline at end of file
@@ -1,6 +1,7 @@
 from google.adk.agents import LlmAgent
 from subagents.tools.gcp_retrieve_tool import gcp_retrieve
 from google.adk.models.lite_llm import LiteLlm
+from subagents.tools.llm_cache import llm_cache_before_model, llm_cache_after_model
 
 rules_consultant_agent = LlmAgent(
     name="RuleConsultantAgent",
@@ -21,5 +22,7 @@ rules_consultant_agent = LlmAgent(
         - Never disclose internal tool: `gcp_retrieve` names or explain tool usage to the user.
         - Always return answers based only on context retrieved from the corpus: `gcp_retrieve`.
     """,
-    tools=[gcp_retrieve]
+    tools=[gcp_retrieve],
+    before_model_callback=llm_cache_before_model,
+    after_model_callback=llm_cache_after_model
 )
\ No newline at end of file
@@ -0,0 +1,97 @@
+# subagents/tools/agent_runtime.py
+"""
+The session service and Runner shared by every reconciliation run of the process.
+
+Building a DatabaseSessionService creates a SQLAlchemy engine and its tables, and building a
+Runner wires the agent tree; both happen once in `start_agent_runtime()` (the API's lifespan)
+instead of on every run. Concurrent runs share the engine's connection pool.
+"""
+import sqlite3
+
+from dotenv import load_dotenv
+from google.adk.runners import Runner
+from google.adk.sessions import DatabaseSessionService
+from subagents.tools.env_settings import env_number, env_str
+load_dotenv()
+
+APP_NAME = "reconciliation"
+USER_ID = "user1"
+
+SESSIONS_DB_PATH = env_str("SESSIONS_DB_PATH", "sessions.db")
+# Any SQLAlchemy URL; defaults to the SQLite file at SESSIONS_DB_PATH.
+SESSIONS_DB_URL = env_str("SESSIONS_DB_URL", f"sqlite:///{SESSIONS_DB_PATH}")
+# Pooled connections kept open to the session store, and extra ones allowed under load.
+SESSIONS_DB_POOL_SIZE = env_number("SESSIONS_DB_POOL_SIZE", 5)
+SESSIONS_DB_MAX_OVERFLOW = env_number("SESSIONS_DB_MAX_OVERFLOW", 10)
+# Seconds a SQLite session store waits for another writer's lock.
+SESSIONS_DB_TIMEOUT_SECONDS = env_number("SESSIONS_DB_TIMEOUT_SECONDS", 30, float)
+
+
+class AgentRuntime:
+    def __init__(self, agent, db_url: str = SESSIONS_DB_URL):
+        self.db_url = db_url
+        engine_options = {}
+        if db_url.startswith("sqlite"):
+            # The pool hands a connection to whichever thread checks it out.
+            engine_options["connect_args"] = {"timeout": SESSIONS_DB_TIMEOUT_SECONDS, "check_same_thread": False}
+            self._enable_wal(db_url)
+        else:
+            # Replace connections a database server has dropped instead of failing a run.
+            engine_options["pool_pre_ping"] = True
+        if db_url != "sqlite://" and ":memory:" not in db_url:
+            engine_options.update(pool_size=SESSIONS_DB_POOL_SIZE, max_overflow=SESSIONS_DB_MAX_OVERFLOW)
+        self.session_service = DatabaseSessionService(db_url=db_url, **engine_options)
+        self.runner = Runner(agent=agent, app_name=APP_NAME, session_service=self.session_service)
+
+    @staticmethod
+    def _enable_wal(db_url: str):
+        # WAL is a property of the database file: set once, it lets the dashboards read
+        # sessions while runs are writing events.
+        path = db_url.split(":///", 1)[-1]
+        if not path or path == ":memory:":
+            return
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+
+    async def warm_up(self):
+        """Checks out a pooled connection and runs a session lookup, so the first run pays no setup cost."""
+        await self.session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="warm-up")
+
+    async def create_session(self):
+        return await self.session_service.create_session(app_name=APP_NAME, user_id=USER_ID)
+
+    def run_async(self, session_id: str, new_message):
+        return self.runner.run_async(user_id=USER_ID, session_id=session_id, new_message=new_message)
+
+    async def close(self):
+        await self.runner.close()
+        self.session_service.db_engine.dispose()
+
+
+_runtime = None
+
+async def start_agent_runtime(agent) -> AgentRuntime:
+    """Builds and warms up the process-wide runtime for `agent`; called once from the API's lifespan."""
+    global _runtime
+    if _runtime is None:
+        runtime = AgentRuntime(agent)
+        await runtime.warm_up()
+        print(f"--- Agent runtime ready (sessions at {runtime.db_url}) ---")
+        _runtime = runtime
+    return _runtime
+
+
+def get_agent_runtime() -> AgentRuntime:
+    if _runtime is None:
+        raise RuntimeError("The agent runtime has not been started.")
+    return _runtime
+
+
+async def stop_agent_runtime():
+    global _runtime
+    if _runtime is not None:
+        await _runtime.close()
+        _runtime = None
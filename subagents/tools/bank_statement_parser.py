@@ -0,0 +1,225 @@
+# subagents/tools/bank_statement_parser.py
+import re
+from array import array
+from decimal import Decimal, ROUND_HALF_UP
+from subagents.tools.date_normalizer import normalize_date
+
+# Statement headers are fingerprinted on this many leading characters of the first page.
+HEADER_SCAN_CHARS = 2000
+# Transaction rows sampled from the first page when scoring a layout.
+LAYOUT_SAMPLE_ROWS = 5
+
+ACCOUNT_NUMBER_PATTERN = re.compile(r"account\s*(?:number|no\.?|#)[:\s]*([\dx*][\dx*\s-]{2,}[\dx*])", re.IGNORECASE)
+IFSC_PATTERN = re.compile(r"ifsc(?:\s*code)?[:\s]*([a-z]{4}0[a-z0-9]{6})", re.IGNORECASE)
+BANK_NAME_PATTERN = re.compile(r"^bank(?:\s*name)?[:\s]+(.+?)[^\S\n]*$", re.IGNORECASE | re.MULTILINE)
+
+
+class BankStatementLayout:
+    """
+    The column layout of one bank's statements.
+
+    - `row_pattern`: regex for one transaction row, compiled with MULTILINE. It must define the
+      named groups `date`, `transaction_id`, `invoice_number`, `description` and `debit`.
+      Use [^\S\n] rather than \s between columns so a row never runs across lines.
+    - `header_markers`: lower-case phrases expected in the statement header (e.g. column titles);
+      the share of them found on the first page is the layout's fingerprint score.
+    - `date_formats`: strptime formats of the `date` column, tried in order.
+    """
+
+    ROW_GROUPS = ("date", "transaction_id", "invoice_number", "description", "debit")
+
+    def __init__(self, name: str, row_pattern: str, header_markers: tuple = (),
+                 date_formats: tuple = ('%d-%m-%Y',)):
+        self.name = name
+        self.row_pattern = re.compile(row_pattern, re.MULTILINE)
+        missing = [group for group in self.ROW_GROUPS if group not in self.row_pattern.groupindex]
+        if missing:
+            raise ValueError(f"Layout '{name}' row pattern is missing the groups: {', '.join(missing)}")
+        self.header_markers = tuple(marker.lower() for marker in header_markers)
+        self.date_formats = tuple(date_formats)
+
+    def score(self, first_page_text: str, header: str) -> tuple:
+        """Returns (share of header markers found, sampled row matches) for the first page."""
+        fingerprint = 0.0
+        if self.header_markers:
+            fingerprint = sum(marker in header for marker in self.header_markers) / len(self.header_markers)
+        rows = 0
+        for rows, _ in enumerate(self.row_pattern.finditer(first_page_text), start=1):
+            if rows >= LAYOUT_SAMPLE_ROWS:
+                break
+        return fingerprint, rows
+
+    @staticmethod
+    def accepts(score: tuple) -> bool:
+        fingerprint, rows = score
+        return rows > 0 or fingerprint == 1.0
+
+
+# The layout the parser was written for:
+# "Date Transaction ID Invoice No. Description Debit Credit Balance", dates as DD-MM-YYYY.
+DEFAULT_LAYOUT = BankStatementLayout(
+    name="default",
+    row_pattern=(
+        r"^[^\S\n]*(?P<date>\d{2}-\d{2}-\d{4})[^\S\n]+"
+        r"(?P<transaction_id>\w+)[^\S\n]+"
+        r"(?P<invoice_number>[\w/]+)[^\S\n]+"
+        r"(?P<description>.+?)[^\S\n]+"         # non-greedy
+        r"(?P<debit>[\d,]+)[^\S\n]+"
+        r"[\d,]+[^\S\n]*$"                     # balance, which ends the row
+    ),
+    header_markers=("date", "transaction id", "invoice no", "description", "debit", "balance"),
+    date_formats=('%d-%m-%Y',),
+)
+
+_layouts = {}
+# Statement account key (issuer + account number) -> name of the layout detected for it.
+_layout_by_account = {}
+
+def register_layout(layout: BankStatementLayout) -> BankStatementLayout:
+    """Adds (or replaces, by name) a layout that statements can be matched against."""
+    _layouts[layout.name] = layout
+    for account_key, name in list(_layout_by_account.items()):
+        if name == layout.name:
+            del _layout_by_account[account_key]
+    return layout
+
+register_layout(DEFAULT_LAYOUT)
+
+
+def statement_account_key(header: str) -> str | None:
+    """Identifies the statement's account as "<issuer>:<account number>", or None if not found."""
+    account = ACCOUNT_NUMBER_PATTERN.search(header)
+    if not account:
+        return None
+    ifsc = IFSC_PATTERN.search(header)
+    if ifsc:
+        issuer = ifsc.group(1)[:4]
+    else:
+        bank = BANK_NAME_PATTERN.search(header)
+        issuer = bank.group(1) if bank else ""
+    account_number = re.sub(r"[\s-]", "", account.group(1))
+    return f"{issuer}:{account_number}".lower()
+
+
+def detect_bank_statement_layout(first_page_text: str) -> BankStatementLayout | None:
+    """
+    Picks the registered layout for a statement from its first page: the layout last used for
+    the same account if it still matches, otherwise the best-scoring one (header fingerprint
+    first, then sampled row matches). Returns None when no layout matches.
+    """
+    header = first_page_text[:HEADER_SCAN_CHARS].lower()
+    account_key = statement_account_key(header)
+
+    cached = _layouts.get(_layout_by_account.get(account_key))
+    if cached and cached.accepts(cached.score(first_page_text, header)):
+        return cached
+
+    best, best_score = None, None
+    for layout in _layouts.values():
+        score = layout.score(first_page_text, header)
+        if layout.accepts(score) and (best_score is None or score > best_score):
+            best, best_score = layout, score
+
+    if best and account_key:
+        _layout_by_account[account_key] = best.name
+    return best
+
+
+class BankTransactionColumns:
+    """
+    Parsed bank transactions as parallel columns rather than one dict per row.
+    Amounts are integer minor units (paise), so sums and comparisons are exact.
+    `to_dicts()` gives the {"transaction_id", ...} rows the tools and API return.
+    `layout` is the name of the layout the rows were parsed with (None if none matched).
+    """
+
+    __slots__ = ("layout", "transaction_ids", "invoice_numbers", "descriptions",
+                 "transaction_dates", "debit_amounts_minor")
+
+    def __init__(self, layout: str = None):
+        self.layout = layout
+        self.transaction_ids = []
+        self.invoice_numbers = []
+        self.descriptions = []
+        self.transaction_dates = []
+        self.debit_amounts_minor = array("q")
+
+    def __len__(self) -> int:
+        return len(self.transaction_ids)
+
+    def debit_amounts(self) -> list:
+        """Debit amounts in rupees, as stored in `bank_transactions.debit_amount`."""
+        return [amount / 100 for amount in self.debit_amounts_minor]
+
+    def to_dicts(self) -> list:
+        return [
+            {
+                "transaction_id": transaction_id,
+                "invoice_number": invoice_number,
+                "description": description,
+                "transaction_date": transaction_date,
+                "debit_amount": debit_amount
+            }
+            for transaction_id, invoice_number, description, transaction_date, debit_amount in zip(
+                self.transaction_ids, self.invoice_numbers, self.descriptions,
+                self.transaction_dates, self.debit_amounts()
+            )
+        ]
+
+
+def _to_minor_units(amount_str: str) -> int:
+    digits = amount_str.replace(",", "")
+    if "." in digits:
+        return int((Decimal(digits) * 100).to_integral_value(ROUND_HALF_UP))
+    return int(digits) * 100
+
+
+def parse_bank_statement_columns(bank_statement_text: str,
+                                 layout: BankStatementLayout = None) -> BankTransactionColumns:
+    """
+    Parses every transaction row of a bank statement (or of one of its pages) in one pass.
+    Without a `layout`, it is detected from the text; if no registered layout matches, the
+    result is empty with `layout` set to None. Rows with an invalid date or amount are skipped
+    with a warning.
+    """
+    if layout is None:
+        layout = detect_bank_statement_layout(bank_statement_text)
+        if layout is None:
+            return BankTransactionColumns()
+
+    columns = BankTransactionColumns(layout.name)
+    for match in layout.row_pattern.finditer(bank_statement_text):
+        date_str, transaction_id, invoice_number, description, debit_str = match.group(*layout.ROW_GROUPS)
+
+        # 1. Format date to YYYY-MM-DD
+        transaction_date = normalize_date(date_str, formats=layout.date_formats)
+        if transaction_date is None:
+            print(f"Skipping malformed line: '{match.group(0)}'. Error: invalid date '{date_str}'")
+            continue
+
+        # 2. Convert the debit amount to minor units
+        try:
+            debit_minor = _to_minor_units(debit_str)
+        except (ValueError, ArithmeticError) as e:
+            print(f"Skipping malformed line: '{match.group(0)}'. Error: {e}")
+            continue
+
+        columns.transaction_ids.append(transaction_id)
+        columns.invoice_numbers.append(invoice_number)
+        columns.descriptions.append(description.strip())
+        columns.transaction_dates.append(transaction_date)
+        columns.debit_amounts_minor.append(debit_minor)
+    return columns
+
+
+def iter_bank_statement_columns(page_texts):
+    """
+    Parses page texts one at a time (e.g. from `iter_pdf_pages`), yielding one column set per page.
+    The layout is detected on the first page that matches one and reused for the pages after it.
+    """
+    layout = None
+    for page_text in page_texts:
+        if page_text:
+            columns = parse_bank_statement_columns(page_text, layout)
+            layout = layout or _layouts.get(columns.layout)
+            yield columns
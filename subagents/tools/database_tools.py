@@ -1,10 +1,53 @@
 # tools/database_tools.py (or your file)
 import sqlite3
 import json
+import itertools
 import traceback 
+from subagents.tools.db_connections import get_connection_manager
+from subagents.tools.write_queue import get_write_queue
+
+INSERT_BANK_TRANSACTION_SQL = """
+    INSERT OR IGNORE INTO bank_transactions (
+        transaction_id, invoice_number, description, status,
+        transaction_date, debit_amount
+    ) VALUES (?, ?, ?, ?, ?, ?)
+"""
+INSERT_INVOICE_SQL = """
+    INSERT OR REPLACE INTO invoices (
+        invoice_number, vendor_name, client_name, invoice_date, due_date, total_amount
+    ) VALUES (?, ?, ?, ?, ?, ?)
+"""
+# Columns of `invoices` that are NOT NULL.
+INVOICE_REQUIRED_FIELDS = ("invoice_number", "invoice_date", "due_date", "vendor_name", "client_name", "total_amount")
+
+
+def bank_transaction_row(transaction: dict) -> tuple | None:
+    """The `bank_transactions` row of a parsed transaction, or None if it has no transaction ID."""
+    if not isinstance(transaction, dict) or not transaction.get('transaction_id'):
+        return None
+    return (
+        transaction.get('transaction_id'),
+        transaction.get('invoice_number'),
+        transaction.get('description'),
+        "Cleared",  # Set a default status
+        transaction.get('transaction_date'),
+        transaction.get('debit_amount')
+    )
+
+
+def invoice_row(invoice: dict) -> tuple | None:
+    """The `invoices` row of an extracted invoice, or None if a required field is missing."""
+    if any(invoice.get(field) is None for field in INVOICE_REQUIRED_FIELDS):
+        return None
+    return (
+        invoice.get('invoice_number'),
+        invoice.get('vendor_name'),
+        invoice.get('client_name'),
+        invoice.get('invoice_date'),
+        invoice.get('due_date'),
+        invoice.get('total_amount')
+    )
 
-# It's good practice to have the DB path easily configurable
-DATABASE_NAME = r"C:\Users\Yaswanth\Invoice_Validation_and_Reconciliation_Agent\database.db"
 
 def save_bank_transactions_tool(transactions_json_string: str) -> str:
     """
@@ -30,128 +73,177 @@ def save_bank_transactions_tool(transactions_json_string: str) -> str:
         print(f"FATAL ERROR: The input string is not valid JSON. Error: {e}")
         return f"Error: Input was not a valid JSON string. Details: {e}"
 
-    conn = None
-    inserted_count = 0
-    try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-
-        
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS bank_transactions (
-            transaction_id TEXT PRIMARY KEY,
-            invoice_number TEXT,
-            description TEXT,
-            status TEXT,
-            transaction_date TEXT,
-            debit_amount REAL
-        )
-        """)
-
-        for i, transaction in enumerate(transactions):
-            print(f"\nProcessing transaction #{i+1}: {transaction}")
-            try:
-                # --- FIX: Directly use the clean data from the parser ---
-                # No more cleaning or parsing is needed here.
-                
-                transaction_id = transaction.get('transaction_id')
-                invoice_number = transaction.get('invoice_number')
-                description = transaction.get('description')
-                transaction_date = transaction.get('transaction_date') # Key is 'transaction_date', not 'date'
-                debit_amount = transaction.get('debit_amount')         # Already a float
-
-                # Basic validation: ensure the primary key exists
-                if not transaction_id:
-                    print(f"  -> SKIPPED: Transaction #{i+1} is missing a 'transaction_id'.")
-                    continue
+    return bank_transactions_result_message(save_bank_transactions_stream(transactions))
 
-                cursor.execute("""
-                    INSERT OR IGNORE INTO bank_transactions (
-                        transaction_id, invoice_number, description, status, 
-                        transaction_date, debit_amount
-                    ) VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    transaction_id,
-                    invoice_number,
-                    description,
-                    "Cleared",  # Set a default status
-                    transaction_date,
-                    debit_amount
-                ))
-                
-                if cursor.rowcount > 0:
-                    print(f"  -> SUCCESS: Transaction {transaction_id} was inserted.")
-                    inserted_count += 1
-                else:
-                    print(f"  -> IGNORED: Transaction {transaction_id} already exists.")
-
-            except (KeyError, TypeError) as e:
-                # This catch block is still useful for unexpected format changes
-                print(f"---!!! FAILED ON TRANSACTION #{i+1} !!!---")
-                print(f"ERROR DETAILS: {e}")
-                print("DATA THAT CAUSED ERROR:", transaction)
-                traceback.print_exc()
-                return f"Operation failed on a transaction. See server logs for details. Error: {e}"
-
-        print(f"\n--- All transactions processed. Committing {inserted_count} new records. ---")
-        conn.commit()
-        return f"Success: Saved {inserted_count} new transactions to the database."
 
-    except sqlite3.Error as e:
-        print(f"FATAL DATABASE ERROR: {e}")
-        traceback.print_exc()
-        return f"A fatal database error occurred: {e}"
-    finally:
-        if conn:
-            print("--- Closing database connection. ---")
-            conn.close()
+def bank_transactions_result_message(result: dict) -> str:
+    if not result["success"]:
+        return f"A fatal database error occurred: {result['error']}"
+    return (f"Success: Saved {result['inserted']} new transactions to the database "
+            f"({result['ignored']} ignored as duplicates or without a transaction ID).")
 
 def save_invoice_data(invoice_data: dict) -> str:
     """
     Saves extracted invoice data to the 'invoices' table in the database.
-    The table schema is relaxed to allow NULL values for better resilience.
     """
     print("--- [Tool] Starting invoice save operation ---")
-    
-    conn = None
+
+    return invoice_result_message(invoice_data, save_invoices_stream([invoice_data]))
+
+
+def invoice_result_message(invoice_data: dict, result: dict) -> str:
+    invoice_num = invoice_data.get('invoice_number', 'N/A')
+    if not result["success"]:
+        return f"Error: A database error occurred while saving invoice {invoice_num}: {result['error']}"
+    if result["ignored"]:
+        return (f"Error: Invoice {invoice_num} was not saved because it is missing a required field "
+                f"({', '.join(INVOICE_REQUIRED_FIELDS)}).")
+    return f"Successfully saved invoice {invoice_num}."
+
+def save_bank_transactions_stream(transactions, chunk_size: int = 1000) -> dict:
+    """
+    Saves bank transactions from an iterable of transaction dicts in bounded chunks, so memory
+    use does not grow with the size of the statement. Each chunk is committed on its own: when a
+    write fails, the chunks before it stay saved, and saving the statement again is safe because
+    transactions already stored are ignored.
+
+    Returns a status dictionary with:
+        - "success" (bool): True if every chunk was written.
+        - "processed" (int): Number of transactions read from the iterable.
+        - "inserted" (int): Number of new rows written to the database.
+        - "ignored" (int): Number of transactions skipped: already stored, or without a transaction ID.
+        - "error" (str or None): Error message if failure occurred.
+    """
+    print("--- [Tool] Starting streaming bank transaction save ---")
+
+    processed = 0
+    def rows():
+        nonlocal processed
+        for transaction in transactions:
+            processed += 1
+            row = bank_transaction_row(transaction)
+            if row:
+                yield row
+
+    inserted, error = _write_rows(INSERT_BANK_TRANSACTION_SQL, rows(), chunk_size)
+    print(f"--- Processed {processed} transactions, committed {inserted} new records. ---")
+    return {"success": error is None, "processed": processed, "inserted": inserted,
+            "ignored": processed - inserted if error is None else 0, "error": error}
+
+
+def save_invoices_stream(invoices, chunk_size: int = 1000) -> dict:
+    """
+    Saves invoices from an iterable of invoice dicts in bounded chunks, each committed on its own.
+    Invoices missing a required field are ignored rather than failing the whole write; an
+    invoice that already exists is replaced.
+
+    Returns a status dictionary with:
+        - "success" (bool): True if every chunk was written.
+        - "processed" (int): Number of invoices read from the iterable.
+        - "inserted" (int): Number of invoices written to the database.
+        - "ignored" (int): Number of invoices skipped for a missing required field.
+        - "error" (str or None): Error message if failure occurred.
+    """
+    processed = 0
+    def rows():
+        nonlocal processed
+        for invoice in invoices:
+            processed += 1
+            row = invoice_row(invoice)
+            if row:
+                yield row
+
+    inserted, error = _write_rows(INSERT_INVOICE_SQL, rows(), chunk_size)
+    print(f"--- Processed {processed} invoices, committed {inserted} records. ---")
+    return {"success": error is None, "processed": processed, "inserted": inserted,
+            "ignored": processed - inserted if error is None else 0, "error": error}
+
+
+def _write_rows(insert_sql: str, rows, chunk_size: int) -> tuple:
+    """
+    Writes row tuples in chunks on the shared writer; returns (inserted, error message or None).
+    Each chunk is read from `rows` before the write lock is taken and committed on its own, so a
+    lazy iterable (e.g. a PDF parsed page by page) never holds the lock while it produces rows.
+    While the API's write queue runs, chunks written from a worker thread are submitted to it one
+    at a time and join its group commits instead.
+    """
+    inserted = 0
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-
-        
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS invoices (
-            invoice_number TEXT PRIMARY KEY,
-            vendor_name TEXT,
-            client_name TEXT,
-            invoice_date TEXT,
-            due_date TEXT,
-            total_amount REAL
-        )
-        """)
-
-        cursor.execute("""
-            INSERT OR REPLACE INTO invoices (
-                invoice_number, vendor_name, client_name, invoice_date, due_date, total_amount
-            ) VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            invoice_data.get('invoice_number'),
-            invoice_data.get('vendor_name'),
-            invoice_data.get('client_name'),
-            invoice_data.get('invoice_date'),
-            invoice_data.get('due_date'),
-            invoice_data.get('total_amount')
-        ))
-
-        conn.commit()
-        invoice_num = invoice_data.get('invoice_number', 'N/A')
-        print(f"  -> SUCCESS: Invoice {invoice_num} was saved to the database.")
-        return f"Successfully saved invoice {invoice_num}."
+        queue = get_write_queue()
+        manager = None
+        rows = iter(rows)
+        while chunk := list(itertools.islice(rows, chunk_size)):
+            if manager is None:
+                queued = queue.submit_threadsafe(insert_sql, chunk)
+                if queued is not None:
+                    inserted += queued
+                    continue
+                manager = get_connection_manager()
+            with manager.write() as conn:
+                changes_before = conn.total_changes
+                conn.executemany(insert_sql, chunk)
+                inserted += conn.total_changes - changes_before
+        return inserted, None
 
     except sqlite3.Error as e:
-        print(f"FATAL DATABASE ERROR saving invoice: {e}")
+        print(f"FATAL DATABASE ERROR: {e}")
         traceback.print_exc()
-        return f"Error: A database error occurred while saving the invoice: {e}"
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
+        return inserted, str(e)
+
+
+async def save_bank_transactions_queued(transactions: list) -> dict:
+    """
+    Saves parsed bank transactions through the write queue, in a group commit with
+    other concurrent uploads. Returns the same status dictionary as `save_bank_transactions_stream`.
+    """
+    rows = [row for row in map(bank_transaction_row, transactions) if row]
+    return await _save_queued(INSERT_BANK_TRANSACTION_SQL, rows, len(transactions))
+
+
+async def save_invoices_queued(invoices: list) -> dict:
+    """
+    Saves extracted invoices through the write queue, in a group commit with other
+    concurrent uploads. Returns the same status dictionary as `save_invoices_stream`.
+    """
+    rows = [row for row in map(invoice_row, invoices) if row]
+    return await _save_queued(INSERT_INVOICE_SQL, rows, len(invoices))
+
+
+async def save_bank_transaction_columns_queued(column_batches, chunk_size: int = 1000) -> dict:
+    """
+    Saves `BankTransactionColumns` (e.g. one per page from `parse_bank_statement_pages`) through
+    the write queue, `chunk_size` rows per request, feeding executemany straight from the columns
+    without building a dict per transaction. Each chunk is committed on its own, as with
+    `save_bank_transactions_stream`, whose status dictionary this returns.
+    """
+    print("--- [Tool] Starting streaming bank transaction save ---")
+
+    processed = sum(len(columns) for columns in column_batches)
+    rows = itertools.chain.from_iterable(
+        zip(columns.transaction_ids, columns.invoice_numbers, columns.descriptions,
+            itertools.repeat("Cleared"), columns.transaction_dates, columns.debit_amounts())
+        for columns in column_batches
+    )
+
+    inserted = 0
+    queue = get_write_queue()
+    try:
+        while chunk := list(itertools.islice(rows, chunk_size)):
+            inserted += await queue.submit(INSERT_BANK_TRANSACTION_SQL, chunk)
+    except sqlite3.Error as e:
+        print(f"FATAL DATABASE ERROR: {e}")
+        return {"success": False, "processed": processed, "inserted": inserted, "ignored": 0, "error": str(e)}
+
+    print(f"--- Processed {processed} transactions, committed {inserted} new records. ---")
+    return {"success": True, "processed": processed, "inserted": inserted,
+            "ignored": processed - inserted, "error": None}
+
+
+async def _save_queued(insert_sql: str, rows: list, processed: int) -> dict:
+    try:
+        inserted = await get_write_queue().submit(insert_sql, rows) if rows else 0
+    except sqlite3.Error as e:
+        print(f"FATAL DATABASE ERROR: {e}")
+        return {"success": False, "processed": processed, "inserted": 0, "ignored": 0, "error": str(e)}
+    return {"success": True, "processed": processed, "inserted": inserted,
+            "ignored": processed - inserted, "error": None}
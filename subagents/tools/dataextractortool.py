@@ -1,13 +1,14 @@
 from google.cloud.storage import Client
 import os
-import io
 import json
-import pdfplumber
+import asyncio
 
 from dotenv import load_dotenv
 load_dotenv()
 
 from typing import Dict, Any
+from subagents.tools.pdf_extractor_pool import format_invoice_content
+from subagents.tools.extraction_cache import extract_pdf_cached
 
 def list_gcs_invoices() -> Dict[str, Any]:
     """
@@ -34,7 +35,7 @@ def list_gcs_invoices() -> Dict[str, Any]:
         return {"success": False, "data": None, "error": str(e)}
     
 
-def extract_invoice_content(file_name: str) -> Dict[str, Any]:
+async def extract_invoice_content(file_name: str) -> Dict[str, Any]:
     """
     Extract text and table content from a PDF invoice stored in GCS.
 
@@ -48,9 +49,6 @@ def extract_invoice_content(file_name: str) -> Dict[str, Any]:
     """
 
     try:
-        text_content = ""
-        table_content = ""
-
         service_account_key_path = os.getenv("gcp_credentials_path")
         bucket_name = os.getenv("SOURCE_BUCKET")
 
@@ -59,27 +57,13 @@ def extract_invoice_content(file_name: str) -> Dict[str, Any]:
         blob = bucket.blob(file_name)
 
         # Download PDF file as bytes
-        pdf_bytes = blob.download_as_bytes()
-
-        # Open with pdfplumber from bytes
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            for page in pdf.pages:
-                # Extract normal text
-                page_text = page.extract_text()
-                if page_text:
-                    text_content += page_text + "\n"
-
-                # Extract table content as text
-                tables = page.extract_tables()
-                if tables:
-                    for table in tables:
-                        for row in table:
-                            row_text = " | ".join([cell if cell else "" for cell in row])
-                            table_content += row_text + "\n"
-
-        content = f"--- TEXT CONTENT ---\n{text_content.strip()}\n--- TABLE CONTENT ---\n{table_content.strip()}"
-
-        return {"success": True, "data": content.strip(), "error": None}
+        pdf_bytes = await asyncio.to_thread(blob.download_as_bytes)
+
+        # Extract text and tables, reusing the cached result for documents seen before
+        extracted = await extract_pdf_cached(pdf_bytes)
+        content = format_invoice_content(extracted)
+
+        return {"success": True, "data": content, "error": None}
 
     except Exception as e:
         return {"success": False, "data": None, "error": str(e)}
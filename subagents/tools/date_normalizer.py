@@ -0,0 +1,104 @@
+# subagents/tools/date_normalizer.py
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+# Tried in this order unless a source has learned a different first choice.
+DATE_FORMATS = (
+    '%d-%m-%Y', '%m-%d-%Y', '%Y-%m-%d',
+    '%b %d, %Y', '%B %d, %Y',
+    '%d %b %Y', '%d %B %Y'
+)
+
+# The numeric layouts are parsed by hand: one regex match instead of a strptime
+# call (and a raised ValueError) per candidate format.
+_DAY_MONTH_YEAR = re.compile(r"(\d{1,2})-(\d{1,2})-(\d{4})")
+_YEAR_MONTH_DAY = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_NUMERIC_FORMATS = {
+    '%d-%m-%Y': (_DAY_MONTH_YEAR, (2, 1, 0)),
+    '%m-%d-%Y': (_DAY_MONTH_YEAR, (2, 0, 1)),
+    '%Y-%m-%d': (_YEAR_MONTH_DAY, (0, 1, 2)),
+}
+
+
+def _try_format(date_string: str, fmt: str) -> str | None:
+    numeric = _NUMERIC_FORMATS.get(fmt)
+    if numeric:
+        pattern, (year, month, day) = numeric
+        match = pattern.fullmatch(date_string)
+        if not match:
+            return None
+        parts = match.groups()
+        try:
+            return date(int(parts[year]), int(parts[month]), int(parts[day])).isoformat()
+        except ValueError:
+            return None
+    try:
+        return datetime.strptime(date_string, fmt).strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def _is_ambiguous(date_string: str) -> bool:
+    """True for a date like 03-04-2025 that reads as a different valid date in DD-MM and MM-DD order."""
+    match = _DAY_MONTH_YEAR.fullmatch(date_string)
+    if not match:
+        return False
+    first, second = int(match.group(1)), int(match.group(2))
+    return first != second and 1 <= first <= 12 and 1 <= second <= 12
+
+
+class DateNormalizer:
+    """
+    Normalizes raw date strings to ISO (YYYY-MM-DD).
+
+    - Results are memoized in an LRU cache, since the same dates repeat across
+      statement rows and invoices.
+    - DD-MM-YYYY, MM-DD-YYYY and YYYY-MM-DD are parsed without strptime.
+    - With a `source` (a vendor, a bank layout, ...) the format that last read an
+      unambiguous date of that source is tried first, e.g. YYYY-MM-DD for a vendor
+      that writes ISO dates. An ambiguous date like 03-04-2025 never teaches a format
+      and is always read in the order of `formats`, so its result does not depend on
+      what the process has parsed before.
+    """
+
+    def __init__(self, cache_size: int = 8192):
+        self._learned_formats = {}
+        self._parse = lru_cache(maxsize=cache_size)(self._parse_uncached)
+
+    @staticmethod
+    def _parse_uncached(date_string: str, preferred: str | None, formats: tuple) -> tuple:
+        """Returns (ISO date, format that read it, whether the date is ambiguous)."""
+        ambiguous = _is_ambiguous(date_string)
+        if preferred and not ambiguous:
+            formats = (preferred,) + tuple(fmt for fmt in formats if fmt != preferred)
+        for fmt in formats:
+            result = _try_format(date_string, fmt)
+            if result:
+                return result, fmt, ambiguous
+        return None, None, ambiguous
+
+    def normalize(self, date_string: str, source: str = None, formats: tuple = DATE_FORMATS) -> str | None:
+        """Returns the ISO date, or None if no format in `formats` matches."""
+        if not date_string:
+            return None
+        date_string = date_string.strip()
+
+        preferred = self._learned_formats.get(source) if source else None
+        result, fmt, ambiguous = self._parse(date_string, preferred, formats)
+        if source and fmt and not ambiguous and fmt != preferred:
+            self._learned_formats[source] = fmt
+        return result
+
+    def learned_format(self, source: str) -> str | None:
+        return self._learned_formats.get(source)
+
+    def cache_info(self):
+        return self._parse.cache_info()
+
+
+date_normalizer = DateNormalizer()
+
+def normalize_date(date_string: str, source: str = None, formats: tuple = DATE_FORMATS) -> str | None:
+    """Normalizes a date with the shared `DateNormalizer`."""
+    return date_normalizer.normalize(date_string, source, formats)
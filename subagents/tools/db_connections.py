@@ -0,0 +1,104 @@
+# subagents/tools/db_connections.py
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from subagents.tools.env_settings import env_number, env_str
+from subagents.tools.migrations import migrate
+load_dotenv()
+
+# The one place the application database path is configured.
+DATABASE_PATH = env_str("DB_PATH", "database.db")
+# Read-only connections kept open for queries.
+DB_READ_POOL_SIZE = env_number("DB_READ_POOL_SIZE", 8)
+# Bytes of the database file each reader maps into memory.
+DB_MMAP_SIZE = env_number("DB_MMAP_SIZE", 256 * 1024 * 1024)
+# Seconds to wait for a free reader, or for another process's write lock.
+DB_TIMEOUT_SECONDS = env_number("DB_TIMEOUT_SECONDS", 30, float)
+
+
+class ConnectionManager:
+    """
+    Shared SQLite connections for one database file, in WAL mode so readers never wait for the writer.
+
+    - `read()` lends one of a fixed pool of connections set to `query_only`, with memory-mapped I/O.
+      Rows are `sqlite3.Row`.
+    - `write()` lends the single writer connection to one caller at a time and commits when the
+      block exits (rolls back on an exception), so writes of this process are serialized.
+    """
+
+    def __init__(self, path: str, read_pool_size: int = DB_READ_POOL_SIZE):
+        self.path = path
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        migrate(self._writer)
+
+        self._readers = queue.Queue()
+        for _ in range(read_pool_size):
+            reader = self._connect()
+            reader.execute("PRAGMA query_only=ON")
+            reader.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+            reader.row_factory = sqlite3.Row
+            self._readers.put(reader)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections are handed between threads (FastAPI runs sync endpoints on a thread pool),
+        # but only ever used by one thread at a time.
+        return sqlite3.connect(self.path, timeout=DB_TIMEOUT_SECONDS, check_same_thread=False)
+
+    @contextmanager
+    def read(self):
+        try:
+            conn = self._readers.get(timeout=DB_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Timed out waiting for a database read connection")
+        try:
+            yield conn
+        finally:
+            # End any read transaction, so it does not pin an old snapshot of the WAL.
+            conn.rollback()
+            self._readers.put(conn)
+
+    @contextmanager
+    def write(self):
+        with self._write_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    def close(self):
+        with self._write_lock:
+            self._writer.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_connection_manager() -> ConnectionManager:
+    """
+    Returns the process-wide connection manager for DATABASE_PATH, opening (and migrating)
+    the database on first use. Each process has its own; SQLite's file locking orders the
+    writers of different processes.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ConnectionManager(DATABASE_PATH)
+        return _manager
+
+
+def close_connection_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close()
+            _manager = None
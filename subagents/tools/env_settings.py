@@ -0,0 +1,24 @@
+# subagents/tools/env_settings.py
+"""
+Settings read from the environment.
+
+`.env.example` lists every key with an empty value and load_dotenv() copies those into the
+environment as empty strings, so an empty value means "not set" and the default is used.
+"""
+import os
+
+
+def env_str(name: str, default: str = None) -> str | None:
+    return os.getenv(name) or default
+
+
+def env_number(name: str, default, cast=int):
+    """The setting converted with `cast`; the default when it is unset, empty or not a number."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        print(f"Warning: Ignoring invalid value '{value}' for {name}.")
+        return default
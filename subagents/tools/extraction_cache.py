@@ -0,0 +1,150 @@
+# subagents/tools/extraction_cache.py
+import json
+import zlib
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+
+from dotenv import load_dotenv
+from subagents.tools.env_settings import env_number, env_str
+from subagents.tools.pdf_extractor_pool import get_extraction_pool, EXTRACTOR_VERSION
+load_dotenv()
+
+
+def document_key(content_sha256: str, include_tables: bool = True) -> str:
+    """
+    Content address of a document: its SHA-256 plus the extractor version that produced the entry.
+    Text-only extractions are stored under their own key.
+    """
+    key = f"{content_sha256}:{EXTRACTOR_VERSION}"
+    return key if include_tables else f"{key}:text"
+
+
+class ExtractionCache:
+    """
+    A size-bounded LRU cache of extracted page text and table rows, persisted in a local SQLite file.
+    Entries are zlib-compressed JSON; when the total stored size exceeds `max_bytes`,
+    the least recently read entries are evicted first.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS extraction_cache (
+            cache_key TEXT PRIMARY KEY,
+            payload BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_extraction_cache_last_access ON extraction_cache(last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM extraction_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE extraction_cache SET last_access = ? WHERE cache_key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, extracted: dict):
+        payload = zlib.compress(json.dumps(extracted).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (cache_key, payload, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, len(payload), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        cursor = self._conn.execute("SELECT cache_key, size FROM extraction_cache ORDER BY last_access")
+        expired = []
+        for cache_key, size in cursor:
+            if total <= self.max_bytes:
+                break
+            expired.append((cache_key,))
+            total -= size
+        self._conn.executemany("DELETE FROM extraction_cache WHERE cache_key = ?", expired)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_in_flight = {}
+
+def get_extraction_cache() -> ExtractionCache:
+    """Returns the process-wide extraction cache, configured from the environment on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache(
+                path=env_str("EXTRACTION_CACHE_PATH", "extraction_cache.db"),
+                max_bytes=env_number("EXTRACTION_CACHE_MAX_BYTES", 512 * 1024 * 1024),
+            )
+        return _cache
+
+
+async def extract_pdf_cached(pdf_source: bytes | str, content_sha256: str = None, include_tables: bool = True) -> dict:
+    """
+    Returns {"pages": [...], "tables": [...]} for a PDF, parsing it on the process pool only
+    when no entry exists for its content hash. Concurrent requests for the same document
+    share a single extraction job.
+
+    Table extraction is the expensive part of pdfplumber's work; with `include_tables=False`
+    only the text is extracted (the "tables" lists are empty), and an entry with tables is
+    reused when one exists.
+
+    `pdf_source` is the PDF content or the path of a file holding it; for a path the
+    caller must pass `content_sha256`, which uploads compute while spooling the file.
+    """
+    cache = get_extraction_cache()
+    content_sha256 = content_sha256 or hashlib.sha256(pdf_source).hexdigest()
+    key = document_key(content_sha256, include_tables)
+    # Keys whose entry answers this request, in order of preference.
+    keys = [key] if include_tables else [key, document_key(content_sha256)]
+
+    for candidate in keys:
+        extracted = await asyncio.to_thread(cache.get, candidate)
+        if extracted is not None:
+            return extracted
+
+    for candidate in keys:
+        pending = _in_flight.get(candidate)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+    pending = asyncio.get_running_loop().create_future()
+    _in_flight[key] = pending
+    try:
+        extracted = await get_extraction_pool().extract(pdf_source, include_tables)
+        await asyncio.to_thread(cache.put, key, extracted)
+        pending.set_result(extracted)
+        return extracted
+    except asyncio.CancelledError:
+        pending.cancel()
+        raise
+    except Exception as e:
+        pending.set_exception(e)
+        # Mark the exception as retrieved when nobody else was waiting on this job.
+        pending.exception()
+        raise
+    finally:
+        del _in_flight[key]
+
@@ -1,62 +1,131 @@
 # subagents/tools/parser.py
 import re
-from datetime import datetime
+from subagents.tools.date_normalizer import normalize_date
+from subagents.tools.bank_statement_parser import parse_bank_statement_columns
 
-def parse_date(date_string: str) -> str | None:
-    """Tries to parse a date string from various common formats."""
+def parse_date(date_string: str, source: str = None) -> str | None:
+    """
+    Tries to parse a date string from various common formats.
+    `source` (e.g. the vendor name) lets the normalizer try that source's usual format first.
+    """
     if not date_string:
         return None
-    date_string = date_string.strip()
-    formats_to_try = [
-        '%d-%m-%Y', '%m-%d-%Y', '%Y-%m-%d',
-        '%b %d, %Y', '%B %d, %Y',
-        '%d %b %Y', '%d %B %Y'
-    ]
-    for fmt in formats_to_try:
-        try:
-            return datetime.strptime(date_string, fmt).strftime('%Y-%m-%d')
-        except ValueError:
-            continue
-    print(f"Warning: Could not parse date '{date_string}' with known formats.")
-    return None
+    parsed = normalize_date(date_string, source)
+    if parsed is None:
+        print(f"Warning: Could not parse date '{date_string.strip()}' with known formats.")
+    return parsed
+
+def _parse_amount(raw_value: str) -> float | None:
+    try:
+        return float(raw_value.replace(",", ""))
+    except ValueError:
+        print(f"Warning: Could not convert amount '{raw_value}' to a number.")
+        return None
+
+# Field name -> (label variants, value pattern, label must start a line, conversion).
+# The first label of each field is its canonical label; the others are variants.
+# Labels are matched case-insensitively; value patterns are written for lower-cased text
+# and the value itself is always taken from the original text.
+INVOICE_FIELDS = {
+    "invoice_number": (["Invoice Number", "Invoice No", "Invoice No.", "Inv No", "Inv No.", "Bill No", "Bill No.", "Bill Number"],
+                       r"[:\s]+([a-z0-9-/]+)", False, str.strip),
+    "vendor_name":    (["Vendor", "Supplier", "Seller"],
+                       r"[:\s]+(.*?)\n", True, str.strip),
+    "client_name":    (["Client", "Customer", "Buyer", "Bill To", "Billed To"],
+                       r"[:\s]+(.*?)\n", True, str.strip),
+    "invoice_date":   (["Invoice Date", "Inv Date", "Bill Date"],
+                       r"[:\s]+([\d-]+)", False, parse_date),
+    "due_date":       (["Due Date", "Payment Due", "Due By"],
+                       r"[:\s]+([\d-]+)", False, parse_date),
+    "total_amount":   (["Total Amount", "Grand Total", "Invoice Total", "Amount Due"],
+                       r"[:\s]*₹?\s*([\d,]+\.\d{2})", False, _parse_amount),
+}
+# A variant label only counts when a colon follows it: "Supplier Details" or "Customer ID: 42"
+# are not labels, and "Amount Due 5.00" in a payment schedule is not the invoice total.
+VARIANT_SEPARATOR = r"[^\S\n]*(?=:)"
+# Converted after the scan, with the vendor name as the date normalizer's source.
+DATE_FIELDS = ("invoice_date", "due_date")
+
+def _compile_invoice_field_pattern(fields: dict) -> tuple:
+    """
+    Compiles every label variant of every field into one regex shaped like a prefix trie,
+    e.g. "Invoice Number", "Invoice Date" and "Inv No" share the "inv" branch, and each
+    label ends in its field's value pattern. Each top-level branch starts with a literal,
+    so the regex engine skips straight to positions that can begin a label, and the cost
+    of a position does not grow with the number of variants.
+
+    Returns the pattern and a map from its value group names to (field name, is canonical).
+    """
+    trie = {}
+    for name, (labels, _, _, _) in fields.items():
+        for i, label in enumerate(labels):
+            node = trie
+            for char in label.lower():
+                node = node.setdefault(char, {})
+            node[None] = (name, i == 0)
+
+    group_fields = {}
+
+    def to_regex(node: dict) -> str:
+        branches = [re.escape(char) + to_regex(child) for char, child in node.items() if char is not None]
+        if None in node:
+            # Longer labels are tried first; this label's value pattern is the last branch.
+            name, canonical = node[None]
+            group = f"{name}__{len(group_fields)}"
+            group_fields[group] = (name, canonical)
+            value_pattern = fields[name][1].replace("(", f"(?P<{group}>", 1)
+            branches.append(value_pattern if canonical else VARIANT_SEPARATOR + value_pattern)
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return re.compile(to_regex(trie)), group_fields
+
+INVOICE_FIELD_PATTERN, _INVOICE_FIELD_GROUPS = _compile_invoice_field_pattern(INVOICE_FIELDS)
+# Used only for the rare text whose lower-cased form has a different length.
+_INVOICE_FIELD_PATTERN_IGNORECASE = re.compile(INVOICE_FIELD_PATTERN.pattern, re.IGNORECASE)
 
 def extract_invoice_data_from_text(text: str) -> dict:
     """
     Extracts invoice details from raw text using precise, label-based regex.
+    All fields are located in a single left-to-right scan. A field's canonical label wins
+    over its variants wherever they appear, otherwise the first occurrence wins, and the
+    scan stops once every field has been found under its canonical label. A field's value
+    may contain another field's label (e.g. "Vendor: Acme Invoice Date: 05-05-2025"):
+    the scan resumes right after the start of each match, not after its end.
     """
-    data = {
-        "invoice_number": None, "vendor_name": None, "client_name": None,
-        "invoice_date": None, "due_date": None, "total_amount": None,
-    }
-
-    patterns = {
-        "invoice_number": r"(?i)Invoice Number[:\s]+([A-Z0-9-/]+)",
-        "vendor_name":    r"(?i)^Vendor[:\s]+(.*?)\n",
-        "client_name":    r"(?i)^Client[:\s]+(.*?)\n",
-        "invoice_date":   r"(?i)Invoice Date[:\s]+([\d-]+)",
-        "due_date":       r"(?i)Due Date[:\s]+([\d-]+)",
-        "total_amount":   r"(?i)Total Amount\s*₹?\s*([\d,]+\.\d{2})",
-    }
-
-    for key, pattern in patterns.items():
-        
-        match = re.search(pattern, text, re.MULTILINE)
-        if match:
-            raw_value = match.group(1).strip() if match.group(1) else None
-            
-            if not raw_value:
-                continue
-
-            if "date" in key:
-                data[key] = parse_date(raw_value)
-            elif "amount" in key:
-                try:
-                    data[key] = float(raw_value.replace(",", ""))
-                except ValueError:
-                    print(f"Warning: Could not convert amount '{raw_value}' to a number.")
-            else:
-                data[key] = raw_value.strip()
-                
+    data = dict.fromkeys(INVOICE_FIELDS)
+    found_canonical = set()
+
+    search_text = text.lower()
+    pattern = INVOICE_FIELD_PATTERN
+    if len(search_text) != len(text):
+        search_text, pattern = text, _INVOICE_FIELD_PATTERN_IGNORECASE
+
+    pos = 0
+    while len(found_canonical) < len(INVOICE_FIELDS):
+        match = pattern.search(search_text, pos)
+        if not match:
+            break
+        start = match.start()
+        pos = start + 1
+        group = match.lastgroup
+        key, canonical = _INVOICE_FIELD_GROUPS[group]
+        _, _, line_start, convert = INVOICE_FIELDS[key]
+
+        if line_start and start and search_text[start - 1] != "\n":
+            continue
+        if key in found_canonical or (not canonical and data[key] is not None):
+            continue
+
+        raw_value = text[match.start(group):match.end(group)].strip()
+        if raw_value:
+            data[key] = raw_value if key in DATE_FIELDS else convert(raw_value)
+            if canonical:
+                found_canonical.add(key)
+
+    for key in DATE_FIELDS:
+        if data[key] is not None:
+            data[key] = parse_date(data[key], source=data["vendor_name"])
+
     return data
 
 def parse_bank_statement_text(bank_statement_text: str) -> dict:
@@ -67,52 +136,9 @@ def parse_bank_statement_text(bank_statement_text: str) -> dict:
         bank_statement_text: The full text content of the bank statement.
 
     Returns:
-        A dictionary structured as {"transactions": [...]}.
+        A dictionary structured as {"transactions": [...], "layout": str or None}.
+        "layout" names the detected statement layout; it is None when the statement
+        matches no registered layout and no transactions could be parsed.
     """
-    transactions = []
-    
-    pattern = re.compile(
-        r"^(\d{2}-\d{2}-\d{4})\s+"    # 1: Date
-        r"(\w+)\s+"                  # 2: Transaction ID
-        r"([\w/]+)\s+"               # 3: Invoice Number
-        r"(.+?)\s+"                  # 4: Description (non-greedy)
-        r"([\d,]+)\s+"               # 5: Debit Amount
-        r"([\d,]+)$",                # 6: Balance (we capture it to end the match)
-        re.MULTILINE                 # Process line by line
-    )
-
-    lines = bank_statement_text.strip().split('\n')
-    for line in lines:
-        match = pattern.search(line.strip())
-        if match:
-            # Extract data from the matched groups
-            date_str = match.group(1)
-            transaction_id = match.group(2)
-            invoice_number = match.group(3)
-            description = match.group(4)
-            debit_str = match.group(5)
-            
-            # --- Clean and format the extracted data ---
-            try:
-                # 1. Format date from DD-MM-YYYY to YYYY-MM-DD
-                formatted_date = datetime.strptime(date_str, '%d-%m-%Y').strftime('%Y-%m-%d')
-                
-                # 2. Convert debit amount string to a number (float)
-                # Note: Your example output showed a string, but a number is more useful.
-                # If you absolutely need a string, use str(debit_amount_float)
-                debit_amount_float = float(debit_str.replace(",", ""))
-
-                transactions.append({
-                    "transaction_id": transaction_id,
-                    "invoice_number": invoice_number,
-                    "description": description.strip(),
-                    "transaction_date": formatted_date,
-                    "debit_amount": debit_amount_float 
-                })
-            except (ValueError, IndexError) as e:
-                print(f"Skipping malformed line: '{line}'. Error: {e}")
-
-    return {"transactions": transactions}
-
-
-
+    columns = parse_bank_statement_columns(bank_statement_text)
+    return {"transactions": columns.to_dicts(), "layout": columns.layout}
@@ -0,0 +1,236 @@
+# subagents/tools/invoice_normalizer.py
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Any
+
+from dotenv import load_dotenv
+from subagents.tools.env_settings import env_number
+from subagents.tools.inv_parser_tool import extract_invoice_data_from_text
+load_dotenv()
+
+# Documents scoring below this are sent to the DataNormalizerAgent instead.
+MIN_CONFIDENCE = env_number("INVOICE_NORMALIZER_MIN_CONFIDENCE", 0.9, float)
+
+TEXT_MARKER = "--- TEXT CONTENT ---"
+TABLE_MARKER = "--- TABLE CONTENT ---"
+
+AMOUNT = r"(?:₹|rs\.?|inr|\$)?\s*([\d,]+(?:\.\d+)?)"
+SUBTOTAL_PATTERN = re.compile(r"^\s*sub\s*-?\s*total[:\s]*" + AMOUNT, re.IGNORECASE | re.MULTILINE)
+TAX_PATTERN = re.compile(
+    r"^\s*(CGST|SGST|IGST|UTGST|GST|VAT|CESS)\b\s*(?:\(?\s*@?\s*(\d+(?:\.\d+)?)\s*%\s*\)?)?[:\s]*" + AMOUNT,
+    re.IGNORECASE | re.MULTILINE
+)
+GSTIN_PATTERN = re.compile(r"GSTIN[:\s]+([0-9A-Z]{15})", re.IGNORECASE)
+BANK_DETAIL_PATTERNS = {
+    "bank_name":      re.compile(r"^\s*bank\s*name[:\s]+(.+?)\s*$", re.IGNORECASE | re.MULTILINE),
+    "account_number": re.compile(r"^\s*(?:account\s*(?:number|no\.?)|a/c\s*no\.?)[:\s]+([\dX*][\dX* -]*[\dX*])\s*$", re.IGNORECASE | re.MULTILINE),
+    "ifsc_code":      re.compile(r"^\s*ifsc(?:\s*code)?[:\s]+([A-Z]{4}0[A-Z0-9]{6})\s*$", re.IGNORECASE | re.MULTILINE),
+    "branch":         re.compile(r"^\s*branch[:\s]+(.+?)\s*$", re.IGNORECASE | re.MULTILINE),
+}
+# A line that starts another labelled field or a section ends a party's address block.
+ADDRESS_STOP_PATTERN = re.compile(
+    r"^(?:[A-Za-z][A-Za-z ./]{0,30}:|[A-Z][A-Z &]+$|(?:PAN|GSTIN|Client|Customer|Buyer|Bill To|Billed To|Vendor|Supplier|Seller)\b)"
+)
+PARTY_LINE_PATTERNS = {
+    "vendor_name": re.compile(r"^(?:vendor|supplier|seller)[:\s]", re.IGNORECASE),
+    "client_name": re.compile(r"^(?:client|customer|buyer|bill(?:ed)? to)[:\s]", re.IGNORECASE),
+}
+# Product table column titles -> schema keys, checked in order.
+PRODUCT_COLUMNS = (
+    ("quantity",     ("qty", "quantity")),
+    ("unit_price",   ("unit price", "price", "rate")),
+    ("total",        ("total", "amount")),
+    ("description",  ("description", "details")),
+    ("product_name", ("product", "item", "name")),
+)
+CURRENCY_MARKERS = (("₹", "INR"), ("INR", "INR"), ("Rs", "INR"), ("$", "USD"), ("€", "EUR"), ("£", "GBP"))
+
+# Weight of each check in the confidence score.
+CHECK_WEIGHTS = {
+    "invoice_number": 2, "invoice_date": 1, "vendor_name": 2, "client_name": 1, "total_amount": 2,
+    "products": 2, "product_totals": 1, "subtotal_matches_products": 1, "total_matches_taxes": 2,
+}
+
+
+def _to_decimal(raw: str) -> Decimal | None:
+    if raw is None:
+        return None
+    try:
+        return Decimal(str(raw).replace(",", "").replace("₹", "").strip())
+    except InvalidOperation:
+        return None
+
+def _format_amount(value: Decimal | None) -> str | None:
+    """Formats an amount the way the DataNormalizerAgent does: no symbols or separators, no trailing zeros."""
+    if value is None:
+        return None
+    return format(value.normalize(), "f")
+
+def _format_date(iso_date: str | None) -> str | None:
+    if not iso_date:
+        return None
+    return datetime.strptime(iso_date, "%Y-%m-%d").strftime("%d-%m-%Y")
+
+def _split_content(content: str) -> tuple:
+    text, _, tables = content.partition(TABLE_MARKER)
+    text = text.replace(TEXT_MARKER, "", 1).strip()
+    rows = [[cell.strip() for cell in line.split("|")] for line in tables.strip().split("\n") if line.strip()]
+    return text, rows
+
+def _party_address(lines: list, key: str) -> str | None:
+    """Joins the lines that follow a party's name line, up to the next label or section."""
+    pattern = PARTY_LINE_PATTERNS[key]
+    for index, line in enumerate(lines):
+        if pattern.match(line):
+            address = []
+            for following in lines[index + 1:]:
+                if not following or ADDRESS_STOP_PATTERN.match(following):
+                    break
+                address.append(following)
+            return ", ".join(address) or None
+    return None
+
+def _vendor_gstin(text: str) -> str | None:
+    """The first GSTIN before the client block, i.e. the issuer's."""
+    client = re.search(r"^(?:client|customer|buyer|bill(?:ed)? to)[:\s]", text, re.IGNORECASE | re.MULTILINE)
+    match = GSTIN_PATTERN.search(text, 0, client.start() if client else len(text))
+    return match.group(1).upper() if match else None
+
+def _product_columns(header: list) -> dict | None:
+    columns = {}
+    for position, title in enumerate(cell.lower() for cell in header):
+        for key, names in PRODUCT_COLUMNS:
+            if key not in columns and any(name in title for name in names):
+                columns[key] = position
+                break
+    if {"product_name", "quantity", "total"} <= columns.keys():
+        return columns
+    return None
+
+def _parse_products(rows: list) -> list:
+    """Reads the product table: the rows under a product header row with the same shape and a numeric quantity."""
+    for index, header in enumerate(rows):
+        columns = _product_columns(header)
+        if not columns:
+            continue
+        products = []
+        for row in rows[index + 1:]:
+            if len(row) != len(header) or not re.fullmatch(r"\d+(?:\.\d+)?", row[columns["quantity"]]):
+                break
+            cell = lambda key: (row[columns[key]] or None) if key in columns else None
+            products.append({
+                "product_name": cell("product_name"),
+                "description": cell("description"),
+                "quantity": cell("quantity"),
+                "unit_price": _format_amount(_to_decimal(cell("unit_price"))),
+                "total": _format_amount(_to_decimal(cell("total"))),
+            })
+        return products
+    return []
+
+def _currency(text: str) -> str | None:
+    for marker, code in CURRENCY_MARKERS:
+        if marker in text:
+            return code
+    return None
+
+
+def normalize_invoice(content: str) -> tuple:
+    """
+    Builds the DataNormalizerAgent JSON schema from `extract_invoice_content` output
+    without an LLM call, and scores how far the result can be trusted.
+
+    Returns:
+        (invoice dict, confidence between 0 and 1, list of failed checks)
+    """
+    text, rows = _split_content(content)
+    lines = [line.strip() for line in text.split("\n")]
+    header = extract_invoice_data_from_text(text)
+
+    products = _parse_products(rows)
+    subtotal = SUBTOTAL_PATTERN.search(text)
+    subtotal = _to_decimal(subtotal.group(1)) if subtotal else None
+    taxes = [
+        {"type": match.group(1).upper(), "rate": _format_amount(_to_decimal(match.group(2))),
+         "amount": _format_amount(_to_decimal(match.group(3)))}
+        for match in TAX_PATTERN.finditer(text)
+    ]
+    total = Decimal(str(header["total_amount"])) if header["total_amount"] is not None else None
+
+    bank_details = {}
+    for key, pattern in BANK_DETAIL_PATTERNS.items():
+        match = pattern.search(text)
+        bank_details[key] = match.group(1) if match else None
+
+    invoice = {
+        "invoice_number": header["invoice_number"],
+        "invoice_date": _format_date(header["invoice_date"]),
+        "due_date": _format_date(header["due_date"]),
+        "vendor_name": header["vendor_name"],
+        "vendor_address": _party_address(lines, "vendor_name"),
+        "vendor_gstin": _vendor_gstin(text),
+        "client_name": header["client_name"],
+        "client_address": _party_address(lines, "client_name"),
+        "products": products,
+        "subtotal": _format_amount(subtotal),
+        "tax_breakdown": taxes,
+        "total_amount": _format_amount(total),
+        "currency": _currency(text),
+        "bank_details": bank_details,
+    }
+
+    # --- Cross-check the document against itself ---
+    product_totals = [(_to_decimal(p["quantity"]), _to_decimal(p["unit_price"]), _to_decimal(p["total"])) for p in products]
+    checks = {
+        "invoice_number": bool(invoice["invoice_number"]),
+        "invoice_date": bool(invoice["invoice_date"]),
+        "vendor_name": bool(invoice["vendor_name"]),
+        "client_name": bool(invoice["client_name"]),
+        "total_amount": total is not None,
+        "products": bool(products),
+        "product_totals": bool(product_totals) and all(
+            None not in amounts and abs(amounts[0] * amounts[1] - amounts[2]) < 1 for amounts in product_totals
+        ),
+        "subtotal_matches_products": subtotal is not None and bool(product_totals) and all(
+            amounts[2] is not None for amounts in product_totals
+        ) and abs(sum(amounts[2] for amounts in product_totals) - subtotal) < 1,
+        "total_matches_taxes": total is not None and subtotal is not None and all(
+            tax["amount"] is not None for tax in taxes
+        ) and abs(subtotal + sum(Decimal(tax["amount"]) for tax in taxes) - total) < 1,
+    }
+    failed = [name for name, passed in checks.items() if not passed]
+    confidence = sum(CHECK_WEIGHTS[name] for name, passed in checks.items() if passed) / sum(CHECK_WEIGHTS.values())
+    return invoice, round(confidence, 2), failed
+
+
+def normalize_invoice_content(content: str) -> Dict[str, Any]:
+    """
+    Converts the raw content returned by `extract_invoice_content` into the invoice JSON schema
+    deterministically, without calling the DataNormalizerAgent.
+
+    Args:
+        content (str): The "data" value returned by `extract_invoice_content`.
+
+    Returns a status dictionary with:
+        - "success" (bool): True if the content could be processed, False otherwise.
+        - "data" (dict or None): {"invoice": the structured invoice JSON,
+                                  "confidence": score between 0 and 1,
+                                  "needs_llm_review": True if the invoice must be sent to the DataNormalizerAgent,
+                                  "failed_checks": names of the checks that did not pass}
+        - "error" (str or None): Error message if failure occurred.
+    """
+    try:
+        invoice, confidence, failed = normalize_invoice(content)
+        return {
+            "success": True,
+            "data": {
+                "invoice": invoice,
+                "confidence": confidence,
+                "needs_llm_review": confidence < MIN_CONFIDENCE,
+                "failed_checks": failed,
+            },
+            "error": None,
+        }
+    except Exception as e:
+        return {"success": False, "data": None, "error": str(e)}
@@ -0,0 +1,121 @@
+# subagents/tools/list_queries.py
+"""
+Keyset-paginated, filtered listing of invoices and bank transactions.
+
+Rows are returned in (date, id) order. A page ends with a cursor holding the key of its last
+row; the next page starts strictly after that key, so every page is an index range scan no
+matter how deep into the table it is. Each filter is backed by an index (migration 5).
+"""
+import json
+import base64
+import sqlite3
+from datetime import date
+
+from dotenv import load_dotenv
+from subagents.tools.env_settings import env_number
+load_dotenv()
+
+# Rows per page when the caller does not ask for a number, and the most a page may hold.
+LIST_PAGE_SIZE = env_number("LIST_PAGE_SIZE", 500)
+LIST_MAX_PAGE_SIZE = env_number("LIST_MAX_PAGE_SIZE", 5000)
+
+# name -> (select, keyset columns, {filter: condition})
+LISTS = {
+    "invoices": (
+        "SELECT invoice_number, invoice_date, due_date, vendor_name, client_name, total_amount FROM invoices",
+        ("invoice_date", "invoice_number"),
+        {
+            "vendor": "vendor_name = :vendor",
+            "invoice_number": "invoice_number = :invoice_number",
+            "start_date": "invoice_date >= :start_date",
+            "end_date": "invoice_date <= :end_date",
+        },
+    ),
+    "bank_transactions": (
+        "SELECT transaction_id, invoice_number, description, transaction_date, debit_amount, status FROM bank_transactions",
+        ("transaction_date", "transaction_id"),
+        {
+            # Transactions carry no vendor; they belong to a vendor through their invoice.
+            "vendor": "invoice_number IN (SELECT invoice_number FROM invoices WHERE vendor_name = :vendor)",
+            "invoice_number": "invoice_number = :invoice_number",
+            "status": "status = :status",
+            "start_date": "transaction_date >= :start_date",
+            "end_date": "transaction_date <= :end_date",
+        },
+    ),
+}
+
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """The key encoded in a cursor; raises ValueError for anything that is not a cursor of ours."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(key, list) or len(key) != 2 or not all(isinstance(value, (str, int, float)) for value in key):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return tuple(key)
+
+
+def validate_filters(filters: dict) -> dict:
+    """Drops unset filters and checks the dates; raises ValueError for a bad date."""
+    filters = {name: value for name, value in filters.items() if value is not None}
+    for name in ("start_date", "end_date"):
+        if name in filters:
+            try:
+                date.fromisoformat(filters[name])
+            except ValueError as e:
+                raise ValueError(f"Invalid {name}: {filters[name]}. Please use YYYY-MM-DD.") from e
+    return filters
+
+
+def page_size(limit: int | None) -> int:
+    return LIST_PAGE_SIZE if limit is None else max(1, min(limit, LIST_MAX_PAGE_SIZE))
+
+
+def fetch_page(conn: sqlite3.Connection, name: str, filters: dict, after: tuple | None, limit: int) -> tuple:
+    """
+    Up to `limit` rows of list `name` matching `filters`, after the key `after`.
+    Returns (rows as dicts, cursor of the next page or None when this is the last one).
+    """
+    select, keys, conditions = LISTS[name]
+    where = [conditions[filter_name] for filter_name in filters]
+    params = dict(filters)
+    if after is not None:
+        where.append(f"({keys[0]}, {keys[1]}) > (:after_0, :after_1)")
+        params.update(after_0=after[0], after_1=after[1])
+    query = (
+        f"{select}{' WHERE ' + ' AND '.join(where) if where else ''} "
+        f"ORDER BY {keys[0]}, {keys[1]} LIMIT {int(limit) + 1}"
+    )
+    cursor = conn.execute(query, params)
+    columns = [column[0] for column in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows.pop()
+        next_cursor = encode_cursor((rows[-1][keys[0]], rows[-1][keys[1]]))
+    return rows, next_cursor
+
+
+def iter_rows(manager, name: str, filters: dict, after: tuple | None = None, limit: int | None = None):
+    """
+    Yields every matching row (or the first `limit`), one page at a time. Each page borrows a
+    read connection only while it is fetched, so a slow consumer holds no connection or snapshot.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = LIST_MAX_PAGE_SIZE if remaining is None else min(remaining, LIST_MAX_PAGE_SIZE)
+        with manager.read() as conn:
+            rows, next_cursor = fetch_page(conn, name, filters, after, size)
+        yield from rows
+        if next_cursor is None:
+            return
+        after = decode_cursor(next_cursor)
+        if remaining is not None:
+            remaining -= len(rows)
@@ -0,0 +1,171 @@
+# subagents/tools/llm_cache.py
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+
+from dotenv import load_dotenv
+from subagents.tools.env_settings import env_number, env_str
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+load_dotenv()
+
+# Key of the pending request, kept in invocation-scoped ("temp:") state between the callbacks.
+_PENDING_KEY_STATE = "temp:llm_cache_key"
+
+
+class LlmResponseCache:
+    """
+    A persistent cache of model responses, stored in a local SQLite file.
+
+    - Entries older than `ttl_seconds` are never returned and are purged on write.
+    - When the stored size exceeds `max_bytes`, the least recently read entries are evicted first.
+    - `hits` / `misses` count lookups since the process started.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            cache_key TEXT PRIMARY KEY,
+            agent_name TEXT NOT NULL,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created_at ON llm_cache(created_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_cache WHERE cache_key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, agent_name: str, response: dict):
+        payload = json.dumps(response)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (cache_key, agent_name, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, agent_name, payload, len(payload), now, now),
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl_seconds,))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        cursor = self._conn.execute("SELECT cache_key, size FROM llm_cache ORDER BY last_access")
+        expired = []
+        for cache_key, size in cursor:
+            if total <= self.max_bytes:
+                break
+            expired.append((cache_key,))
+            total -= size
+        self._conn.executemany("DELETE FROM llm_cache WHERE cache_key = ?", expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LlmResponseCache:
+    """Returns the process-wide LLM response cache, configured from the environment on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LlmResponseCache(
+                path=env_str("LLM_CACHE_PATH", "llm_cache.db"),
+                ttl_seconds=env_number("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600, float),
+                max_bytes=env_number("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+            )
+        return _cache
+
+
+def _without_call_ids(value):
+    """Drops the per-run ids ADK puts on function calls/responses, which would defeat the cache key."""
+    if isinstance(value, dict):
+        return {
+            key: ({k: v for k, v in item.items() if k != "id"}
+                  if key in ("function_call", "function_response") and isinstance(item, dict)
+                  else _without_call_ids(item))
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_without_call_ids(item) for item in value]
+    return value
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def request_cache_key(agent_name: str, llm_request: LlmRequest) -> str:
+    """Cache key: agent name, model, hash of the instruction and tools, hash of the conversation contents."""
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    if hasattr(instruction, "model_dump"):
+        instruction = instruction.model_dump(mode="json", exclude_none=True)
+    prompt_hash = _digest({"instruction": instruction, "tools": sorted(llm_request.tools_dict)})
+    input_hash = _digest(_without_call_ids(
+        [content.model_dump(mode="json", exclude_none=True) for content in llm_request.contents]
+    ))
+    return f"{agent_name}:{llm_request.model}:{prompt_hash}:{input_hash}"
+
+
+async def llm_cache_before_model(callback_context: CallbackContext, llm_request: LlmRequest) -> LlmResponse | None:
+    """`before_model_callback`: answers from the cache, skipping the model call, when the request was seen before."""
+    key = request_cache_key(callback_context.agent_name, llm_request)
+    cached = await asyncio.to_thread(get_llm_cache().get, key)
+    if cached is not None:
+        print(f"--- [LLM cache] hit for {callback_context.agent_name} ---")
+        callback_context.state[_PENDING_KEY_STATE] = None
+        return LlmResponse.model_validate(cached)
+    callback_context.state[_PENDING_KEY_STATE] = key
+    return None
+
+
+async def llm_cache_after_model(callback_context: CallbackContext, llm_response: LlmResponse) -> LlmResponse | None:
+    """`after_model_callback`: stores complete, successful model responses under the pending request's key."""
+    key = callback_context.state.get(_PENDING_KEY_STATE)
+    if not key or llm_response.partial or llm_response.error_code or not llm_response.content:
+        return None
+    callback_context.state[_PENDING_KEY_STATE] = None
+    response = _without_call_ids(llm_response.model_dump(mode="json", exclude_none=True))
+    await asyncio.to_thread(get_llm_cache().put, key, callback_context.agent_name, response)
+    return None
@@ -0,0 +1,279 @@
+# subagents/tools/migrations.py
+"""
+Versioned schema migrations for database.db and sessions.db.
+
+Each database records the last migration applied in `PRAGMA user_version`. `migrate()` applies
+the newer ones in order, each in its own transaction together with the version bump, so a
+failed migration leaves the database at the previous version.
+
+Run `python -m subagents.tools.migrations` to migrate the configured databases and check
+that the hot queries use their indexes.
+"""
+import sys
+import sqlite3
+
+from dotenv import load_dotenv
+from subagents.tools.env_settings import env_str
+load_dotenv()
+
+# (version, description, statements). Append new migrations; never edit or reorder applied ones.
+MIGRATIONS = (
+    (1, "baseline schema", (
+        """
+        CREATE TABLE IF NOT EXISTS invoices(
+            invoice_number VARCHAR(255) PRIMARY KEY NOT NULL,
+            invoice_date DATE NOT NULL,
+            due_date DATE NOT NULL,
+            vendor_name VARCHAR(255) NOT NULL,
+            client_name VARCHAR(255) NOT NULL,
+            total_amount DECIMAL(12, 2) NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS bank_transactions (
+            transaction_id TEXT PRIMARY KEY NOT NULL,
+            invoice_number TEXT,
+            description TEXT,
+            transaction_date TEXT NOT NULL,
+            debit_amount REAL NOT NULL,
+            status TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS reconciliation_results (
+            run_id VARCHAR(36) NOT NULL,
+            invoice_number VARCHAR(255) NOT NULL,
+            vendor_name VARCHAR(255) NOT NULL,
+            claimed_total DECIMAL(14, 2) NOT NULL,
+            payment_dates TEXT,
+            transaction_ids TEXT,
+            amount_paid DECIMAL(14, 2),
+            status VARCHAR(50) NOT NULL CHECK (status IN ('PAID', 'DUE')),
+            verdict VARCHAR(50) NOT NULL CHECK (verdict IN ('VERIFIED', 'UNDERPAID', 'OVERPAID', 'UNPAID', 'DISPUTED')),
+            conclusion TEXT,
+            processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, invoice_number)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS reconciliation_runs (
+            run_id VARCHAR(36) PRIMARY KEY,
+            start_date DATE,
+            end_date DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status VARCHAR(50) NOT NULL,
+            no_of_invoices INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS runsessions (
+            runID TEXT PRIMARY KEY,
+            sessionID TEXT NOT NULL
+        )
+        """,
+    )),
+    # Lookups of a run's results (and /run-ids) use the (run_id, invoice_number) primary key.
+    # Covering index for invoice_number lookups and the per-invoice aggregation of the
+    # reconciliation: each invoice's transactions are read in (transaction_date, transaction_id)
+    # order straight from the index, which also gives group_concat its date order.
+    (2, "bank transaction indexes", (
+        "CREATE INDEX IF NOT EXISTS idx_bank_transactions_reconciliation "
+        "ON bank_transactions(invoice_number, transaction_date, transaction_id, debit_amount)",
+        "CREATE INDEX IF NOT EXISTS idx_bank_transactions_transaction_date ON bank_transactions(transaction_date)",
+    )),
+    # `reconciliation_watermarks` holds, per invoice, what its latest result was computed from:
+    # the invoice's rowid (INSERT OR REPLACE gives a re-saved invoice a new rowid), the highest
+    # bank transaction rowid at the time, the date range, and the run that holds the result.
+    # `reconciliation_matches` holds the invoices proposed for transactions without one.
+    (3, "incremental reconciliation and payment matches", (
+        """
+        CREATE TABLE IF NOT EXISTS reconciliation_watermarks (
+            invoice_number VARCHAR(255) PRIMARY KEY,
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            invoice_version INTEGER NOT NULL,
+            last_transaction_rowid INTEGER NOT NULL,
+            run_id VARCHAR(36) NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS reconciliation_matches (
+            run_id VARCHAR(36) NOT NULL,
+            transaction_id TEXT NOT NULL,
+            invoice_number VARCHAR(255) NOT NULL,
+            match_type VARCHAR(20) NOT NULL CHECK (match_type IN ('AMOUNT', 'SPLIT')),
+            confidence REAL NOT NULL,
+            PRIMARY KEY (run_id, transaction_id)
+        )
+        """,
+    )),
+    # The parsed audit report of each completed run, so /run-reports reads one table instead of
+    # looking up every run's latest event in sessions.db. Rows are listed in rowid (completion) order.
+    (4, "run reports", (
+        """
+        CREATE TABLE IF NOT EXISTS run_reports (
+            run_id VARCHAR(36) PRIMARY KEY,
+            session_id TEXT,
+            audit_report TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    )),
+    # Keyset pages of /api/invoices and /api/bank/transactions are read in (date, id) order, alone
+    # or under one equality filter; each of these indexes serves one such scan without sorting.
+    # The date index of migration 2 is replaced by one that also holds the id tie-breaker.
+    (5, "list endpoint indexes", (
+        "CREATE INDEX IF NOT EXISTS idx_invoices_invoice_date ON invoices(invoice_date, invoice_number)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_vendor ON invoices(vendor_name, invoice_date, invoice_number)",
+        "DROP INDEX IF EXISTS idx_bank_transactions_transaction_date",
+        "CREATE INDEX IF NOT EXISTS idx_bank_transactions_date_id ON bank_transactions(transaction_date, transaction_id)",
+        "CREATE INDEX IF NOT EXISTS idx_bank_transactions_status "
+        "ON bank_transactions(status, transaction_date, transaction_id)",
+    )),
+    # What a run was asked for: its date range and the data version (highest bank transaction and
+    # invoice rowids) when it was queued. A request for the same range on unchanged data is answered
+    # with the stored run instead of a new one.
+    (6, "run report request keys", (
+        "ALTER TABLE run_reports ADD COLUMN start_date DATE",
+        "ALTER TABLE run_reports ADD COLUMN end_date DATE",
+        "ALTER TABLE run_reports ADD COLUMN transactions_version INTEGER",
+        "ALTER TABLE run_reports ADD COLUMN invoices_version INTEGER",
+        "CREATE INDEX IF NOT EXISTS idx_run_reports_request "
+        "ON run_reports(start_date, end_date, transactions_version, invoices_version)",
+    )),
+)
+
+# sessions.db belongs to ADK's DatabaseSessionService, which creates its tables; only indexes are added here.
+SESSIONS_MIGRATIONS = (
+    # The latest event of a session (/run-reports) without scanning and sorting all events.
+    (1, "events by session and time", (
+        "CREATE INDEX IF NOT EXISTS idx_events_session_timestamp ON events(session_id, timestamp)",
+    )),
+)
+
+# Hot queries -> the index each one must use: (name, database, query, expected index).
+QUERY_PLAN_CHECKS = (
+    ("report by run id", "database",
+     "SELECT * FROM reconciliation_results WHERE run_id = ?",
+     "sqlite_autoindex_reconciliation_results_1"),
+    ("run ids", "database",
+     "SELECT DISTINCT run_id FROM reconciliation_results",
+     "sqlite_autoindex_reconciliation_results_1"),
+    ("transactions by invoice number", "database",
+     "SELECT * FROM bank_transactions WHERE invoice_number = ?",
+     "idx_bank_transactions_reconciliation"),
+    ("transactions by date range", "database",
+     "SELECT * FROM bank_transactions WHERE transaction_date BETWEEN ? AND ?",
+     "idx_bank_transactions_date_id"),
+    ("transaction page", "database",
+     "SELECT * FROM bank_transactions WHERE (transaction_date, transaction_id) > (?, ?) "
+     "ORDER BY transaction_date, transaction_id LIMIT 500",
+     "idx_bank_transactions_date_id"),
+    ("transaction page by status", "database",
+     "SELECT * FROM bank_transactions WHERE status = ? AND (transaction_date, transaction_id) > (?, ?) "
+     "ORDER BY transaction_date, transaction_id LIMIT 500",
+     "idx_bank_transactions_status"),
+    ("invoice page", "database",
+     "SELECT * FROM invoices WHERE (invoice_date, invoice_number) > (?, ?) ORDER BY invoice_date, invoice_number LIMIT 500",
+     "idx_invoices_invoice_date"),
+    ("invoice page by vendor", "database",
+     "SELECT * FROM invoices WHERE vendor_name = ? AND (invoice_date, invoice_number) > (?, ?) "
+     "ORDER BY invoice_date, invoice_number LIMIT 500",
+     "idx_invoices_vendor"),
+    ("run report by run id", "database",
+     "SELECT audit_report FROM run_reports WHERE run_id = ?",
+     "sqlite_autoindex_run_reports_1"),
+    ("completed run for a request", "database",
+     "SELECT run_id FROM run_reports WHERE start_date = ? AND end_date = ? AND transactions_version = ? "
+     "AND invoices_version = ? ORDER BY rowid DESC LIMIT 1",
+     "idx_run_reports_request"),
+    ("latest event of a session", "sessions",
+     "SELECT content FROM events WHERE session_id = ? ORDER BY timestamp DESC LIMIT 1",
+     "idx_events_session_timestamp"),
+)
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, migrations: tuple = MIGRATIONS) -> int:
+    """
+    Applies the migrations newer than the database's `user_version`, in order.
+    Must be called outside a transaction. Returns the resulting schema version.
+    """
+    for version, description, statements in migrations:
+        if version <= schema_version(conn):
+            continue
+        # IMMEDIATE takes the write lock first, so two processes cannot apply the same migration.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if version > schema_version(conn):
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                print(f"--- Applied migration {version}: {description} ---")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+    return schema_version(conn)
+
+
+def migrate_sessions(conn: sqlite3.Connection) -> int:
+    """
+    Applies SESSIONS_MIGRATIONS once ADK has created its tables; until then it does nothing,
+    so it is safe to call before the first session exists.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events'").fetchone() is None:
+        return schema_version(conn)
+    return migrate(conn, SESSIONS_MIGRATIONS)
+
+
+def migrate_databases(database_path: str = None, sessions_path: str = None):
+    """Migrates database.db and sessions.db at the configured paths (DB_PATH, SESSIONS_DB_PATH)."""
+    targets = (
+        (database_path or env_str("DB_PATH", "database.db"), migrate),
+        (sessions_path or env_str("SESSIONS_DB_PATH", "sessions.db"), migrate_sessions),
+    )
+    for path, run in targets:
+        conn = sqlite3.connect(path)
+        try:
+            print(f"--- Schema of {path} is at version {run(conn)} ---")
+        finally:
+            conn.close()
+
+
+def check_query_plans(connections: dict) -> list:
+    """
+    Runs EXPLAIN QUERY PLAN for QUERY_PLAN_CHECKS against {"database": conn, "sessions": conn}
+    and returns a description of each hot query that does not use its index (empty when all do).
+    """
+    failures = []
+    for name, database, query, index in QUERY_PLAN_CHECKS:
+        conn = connections.get(database)
+        if conn is None:
+            continue
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", (None,) * query.count("?")).fetchall()
+        details = [row[-1] for row in plan]
+        if not any(f"INDEX {index}" in detail for detail in details):
+            failures.append(f"{name}: expected {index}, got {' / '.join(details)}")
+    return failures
+
+
+if __name__ == "__main__":
+    # python -m subagents.tools.migrations [database.db] [sessions.db]
+    database_path = sys.argv[1] if len(sys.argv) > 1 else None
+    sessions_path = sys.argv[2] if len(sys.argv) > 2 else None
+    migrate_databases(database_path, sessions_path)
+
+    connections = {
+        "database": sqlite3.connect(database_path or env_str("DB_PATH", "database.db")),
+        "sessions": sqlite3.connect(sessions_path or env_str("SESSIONS_DB_PATH", "sessions.db")),
+    }
+    if connections["sessions"].execute("SELECT 1 FROM sqlite_master WHERE name = 'events'").fetchone() is None:
+        del connections["sessions"]
+    failures = check_query_plans(connections)
+    for failure in failures:
+        print(f"QUERY PLAN CHECK FAILED: {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,243 @@
+# subagents/tools/payment_matcher.py
+import re
+import heapq
+import sqlite3
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date
+
+# Days before the invoice date and after the due date in which a payment is still considered.
+DATE_SLACK_BEFORE = 7
+DATE_SLACK_AFTER = 30
+# Largest difference between a payment and the open balance that still counts as equal (paise).
+AMOUNT_TOLERANCE_MINOR = 100
+# Split payments: at most this many transactions, chosen from this many best vendor candidates.
+MAX_SPLIT_PARTS = 3
+MAX_SPLIT_POOL = 16
+MIN_CONFIDENCE = 0.5
+
+VENDOR_STOPWORDS = {"pvt", "ltd", "private", "limited", "the", "and", "inc", "llp", "llc", "corp", "company", "india"}
+
+# Transactions of the date range that carry no invoice number, or one that matches no invoice.
+UNASSIGNED_TRANSACTIONS_QUERY = """
+SELECT t.transaction_id, t.description, t.transaction_date, CAST(ROUND(t.debit_amount * 100) AS INTEGER)
+FROM bank_transactions t
+WHERE t.transaction_date BETWEEN :start_date AND :end_date
+  AND (t.invoice_number IS NULL
+       OR NOT EXISTS (SELECT 1 FROM invoices i WHERE i.invoice_number = t.invoice_number))
+"""
+
+# Invoices the run left open, with the balance still due.
+OPEN_INVOICES_QUERY = """
+SELECT r.invoice_number, r.vendor_name, i.invoice_date, i.due_date,
+       CAST(ROUND(r.claimed_total * 100) AS INTEGER) - CAST(ROUND(COALESCE(r.amount_paid, 0) * 100) AS INTEGER)
+FROM reconciliation_results r
+JOIN invoices i ON i.invoice_number = r.invoice_number
+WHERE r.run_id = :run_id AND r.verdict IN ('UNPAID', 'UNDERPAID')
+"""
+
+
+def vendor_tokens(text: str) -> set:
+    """Distinctive lower-case words of a vendor name or transaction description."""
+    return {
+        token for token in re.findall(r"[a-z0-9]+", (text or "").lower())
+        if len(token) >= 3 and token not in VENDOR_STOPWORDS
+    }
+
+
+def _ordinal(iso_date: str) -> int | None:
+    try:
+        return date.fromisoformat(iso_date).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+class UnassignedTransactionIndex:
+    """
+    In-memory indexes over the transactions that have no invoice yet:
+    - amounts, sorted, for bisect lookups of an open balance;
+    - per description token, the transactions sorted by date, so a vendor's payments within a
+      date window are a bisect slice rather than a scan.
+    """
+
+    def __init__(self, rows):
+        self.transaction_ids = []
+        self.ordinals = []
+        self.amounts = []
+        self.tokens = []
+        by_token = defaultdict(list)
+
+        for transaction_id, description, transaction_date, amount_minor in rows:
+            ordinal = _ordinal(transaction_date)
+            if ordinal is None or amount_minor is None:
+                continue
+            position = len(self.transaction_ids)
+            self.transaction_ids.append(transaction_id)
+            self.ordinals.append(ordinal)
+            self.amounts.append(amount_minor)
+            self.tokens.append(vendor_tokens(description))
+            for token in self.tokens[position]:
+                by_token[token].append(position)
+
+        self._amount_order = sorted(range(len(self.amounts)), key=self.amounts.__getitem__)
+        self._sorted_amounts = [self.amounts[position] for position in self._amount_order]
+        # token -> (sorted dates, positions in the same order)
+        self._by_token = {}
+        for token, positions in by_token.items():
+            positions.sort(key=self.ordinals.__getitem__)
+            self._by_token[token] = ([self.ordinals[position] for position in positions], positions)
+
+    def __len__(self) -> int:
+        return len(self.transaction_ids)
+
+    def with_amount(self, low: int, high: int) -> list:
+        """Positions of transactions with low <= amount <= high."""
+        start = bisect_left(self._sorted_amounts, low)
+        end = bisect_right(self._sorted_amounts, high)
+        return self._amount_order[start:end]
+
+    def with_token(self, token: str, first_ordinal: int, last_ordinal: int) -> tuple:
+        """(count, positions) of transactions mentioning `token`, dated within [first_ordinal, last_ordinal]."""
+        ordinals, positions = self._by_token.get(token, ((), ()))
+        start, end = bisect_left(ordinals, first_ordinal), bisect_right(ordinals, last_ordinal)
+        return end - start, positions[start:min(end, start + MAX_SPLIT_POOL)]
+
+
+def _confidence(vendor_score: float, in_terms: bool, parts: int) -> float:
+    if parts == 1:
+        score = 0.45 + 0.35 * vendor_score + 0.2 * in_terms
+    else:
+        # A combination of payments is only plausible when the descriptions name the vendor.
+        score = (0.3 + 0.45 * vendor_score + 0.25 * in_terms) * (1 - 0.1 * (parts - 1))
+    return round(score, 2)
+
+
+def find_match(index: UnassignedTransactionIndex, invoice: tuple, used: set) -> dict | None:
+    """
+    Best candidate payment(s) for one open invoice: a single transaction for the open balance,
+    or a bounded subset-sum over the invoice's vendor candidates. Transactions in `used` are
+    skipped. Returns None below MIN_CONFIDENCE.
+    """
+    invoice_number, vendor_name, invoice_date, due_date, balance = invoice
+    issued, due = _ordinal(invoice_date), _ordinal(due_date)
+    if balance <= 0 or issued is None:
+        return None
+    due = due if due is not None and due >= issued else issued
+    first, last = issued - DATE_SLACK_BEFORE, due + DATE_SLACK_AFTER
+
+    tokens = vendor_tokens(vendor_name)
+    vendor_score = lambda position: len(tokens & index.tokens[position]) / len(tokens) if tokens else 0.0
+    in_terms = lambda positions: all(issued <= index.ordinals[p] <= due for p in positions)
+
+    best = None
+    # 1. One payment for the whole open balance
+    for position in index.with_amount(balance - AMOUNT_TOLERANCE_MINOR, balance + AMOUNT_TOLERANCE_MINOR):
+        if position not in used and first <= index.ordinals[position] <= last:
+            confidence = _confidence(vendor_score(position), in_terms([position]), 1)
+            if best is None or confidence > best[0]:
+                best = (confidence, [position], "AMOUNT")
+
+    # 2. Several payments adding up to the balance, among the vendor's transactions in the window
+    #    (a bounded share of each token's slice, rarest tokens first)
+    slices = sorted(index.with_token(token, first, last) for token in tokens)
+    scores = {
+        position: vendor_score(position) for _, positions in slices for position in positions
+        if position not in used and index.amounts[position] < balance
+    }
+    pool = sorted(scores, key=lambda p: (-scores[p], -index.amounts[p]))[:MAX_SPLIT_POOL]
+    pool.sort(key=lambda p: -index.amounts[p])
+    amounts = [index.amounts[p] for p in pool]
+    descending = [-amount for amount in amounts]
+
+    def search(start: int, chosen: list, total: int):
+        nonlocal best
+        if len(chosen) >= 2 and abs(total - balance) <= AMOUNT_TOLERANCE_MINOR:
+            confidence = _confidence(min(scores[p] for p in chosen), in_terms(chosen), len(chosen))
+            if best is None or confidence > best[0]:
+                best = (confidence, list(chosen), "SPLIT")
+            return
+        slots = MAX_SPLIT_PARTS - len(chosen)
+        if slots == 0:
+            return
+        if slots == 1:
+            # The last part has to close the balance: bisect for it instead of trying each amount.
+            need = balance - total
+            low = bisect_left(descending, -(need + AMOUNT_TOLERANCE_MINOR), start)
+            high = bisect_right(descending, -(need - AMOUNT_TOLERANCE_MINOR), start)
+            for i in range(low, high):
+                chosen.append(pool[i])
+                search(i + 1, chosen, total + amounts[i])
+                chosen.pop()
+            return
+        for i in range(start, len(pool)):
+            # Amounts are in descending order: if the largest ones left cannot reach the balance, nothing after can.
+            if total + sum(amounts[i:i + slots]) < balance - AMOUNT_TOLERANCE_MINOR:
+                break
+            if total + amounts[i] > balance + AMOUNT_TOLERANCE_MINOR:
+                continue
+            chosen.append(pool[i])
+            search(i + 1, chosen, total + amounts[i])
+            chosen.pop()
+
+    # A split scores at most _confidence(1.0, True, 2); skip the search when a single payment already beats that.
+    if best is None or best[0] < _confidence(1.0, True, 2):
+        search(0, [], 0)
+
+    if best is None or best[0] < MIN_CONFIDENCE:
+        return None
+    confidence, positions, match_type = best
+    return {
+        "invoice_number": invoice_number,
+        "transaction_ids": [index.transaction_ids[p] for p in positions],
+        "positions": positions,
+        "match_type": match_type,
+        "confidence": confidence,
+    }
+
+
+def match_unassigned_payments(conn: sqlite3.Connection, run_id: str, start_date: str, end_date: str) -> list:
+    """
+    Proposes invoices for the run's transactions that carry no usable invoice number and saves the
+    proposals to `reconciliation_matches`. Each transaction is assigned at most once, highest
+    confidence first. Verdicts in `reconciliation_results` are left unchanged. The caller commits.
+
+    Returns the matches as {"invoice_number", "transaction_ids", "match_type", "confidence"} dicts.
+    """
+    params = {"run_id": run_id, "start_date": start_date, "end_date": end_date}
+
+    index = UnassignedTransactionIndex(conn.execute(UNASSIGNED_TRANSACTIONS_QUERY, params))
+    if not index:
+        return []
+    open_invoices = conn.execute(OPEN_INVOICES_QUERY, params).fetchall()
+
+    used = set()
+    matches = []
+    # (-confidence, invoice order, proposal): the best proposal is taken first, ties in invoice order.
+    proposals = [
+        (-match["confidence"], order, match)
+        for order, match in enumerate(find_match(index, invoice, used) for invoice in open_invoices) if match
+    ]
+    heapq.heapify(proposals)
+    while proposals:
+        _, order, proposal = heapq.heappop(proposals)
+        if used.intersection(proposal["positions"]):
+            # A better match took one of the transactions; look again without them and queue the
+            # new proposal behind the better ones still waiting.
+            proposal = find_match(index, open_invoices[order], used)
+            if proposal is not None:
+                heapq.heappush(proposals, (-proposal["confidence"], order, proposal))
+            continue
+        used.update(proposal.pop("positions"))
+        matches.append(proposal)
+
+    conn.execute("DELETE FROM reconciliation_matches WHERE run_id = ?", (run_id,))
+    conn.executemany(
+        "INSERT INTO reconciliation_matches (run_id, transaction_id, invoice_number, match_type, confidence) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            (run_id, transaction_id, match["invoice_number"], match["match_type"], match["confidence"])
+            for match in matches for transaction_id in match["transaction_ids"]
+        ]
+    )
+    print(f"--- Proposed {len(matches)} payment matches from {len(index)} unassigned transactions. ---")
+    return matches
@@ -0,0 +1,222 @@
+# subagents/tools/pdf_extractor_pool.py
+import os
+import io
+import asyncio
+import threading
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+from dotenv import load_dotenv
+from subagents.tools.env_settings import env_number
+from subagents.tools.bank_statement_parser import iter_bank_statement_columns
+load_dotenv()
+
+
+# Bump the suffix whenever the shape or content of `extract_pdf_content` output changes,
+# so cached extractions from older code are not reused.
+EXTRACTOR_VERSION = f"pdfplumber-{pdfplumber.__version__}/1"
+
+
+class ExtractionQueueFull(Exception):
+    """Raised when the pool already holds the maximum number of pending jobs."""
+
+
+class ExtractionTimeout(Exception):
+    """Raised when a single extraction job runs longer than the configured timeout."""
+
+
+def _open_pdf(pdf_source: bytes | str):
+    """Opens a PDF given either its content or the path of a file holding it."""
+    if isinstance(pdf_source, str):
+        return pdfplumber.open(pdf_source)
+    return pdfplumber.open(io.BytesIO(pdf_source))
+
+
+def extract_pdf_content(pdf_source: bytes | str, include_tables: bool = True) -> dict:
+    """
+    Extracts the text (and optionally the table rows) of every page of a PDF.
+    This runs inside a pool worker process, so it must stay a plain module-level function.
+    `pdf_source` is the PDF content or, for large uploads, the path of a temp file holding it,
+    which avoids pickling the whole document to the worker.
+
+    Returns:
+        A dictionary structured as {"pages": [str, ...], "tables": [[[cell, ...], ...], ...]}
+        with one entry per page in both lists.
+    """
+    pages = []
+    tables = []
+    with _open_pdf(pdf_source) as pdf:
+        for page in pdf.pages:
+            pages.append(page.extract_text() or "")
+
+            page_rows = []
+            if include_tables:
+                for table in page.extract_tables() or []:
+                    for row in table:
+                        page_rows.append([cell if cell else "" for cell in row])
+            tables.append(page_rows)
+
+    return {"pages": pages, "tables": tables}
+
+
+def iter_pdf_pages(pdf_source: bytes | str):
+    """
+    Yields the text of a PDF one page at a time, releasing each page's parsed objects
+    before moving on, so memory stays flat regardless of the page count.
+    """
+    with _open_pdf(pdf_source) as pdf:
+        for page in pdf.pages:
+            yield page.extract_text() or ""
+            page.close()
+
+
+def parse_bank_statement_pages(pdf_source: bytes | str) -> list:
+    """
+    Pool job that extracts and parses a bank statement page by page, returning one
+    `BankTransactionColumns` per page. Only the compact columns are sent back; saving them
+    is left to the API process, which owns the database writer.
+    """
+    return list(iter_bank_statement_columns(iter_pdf_pages(pdf_source)))
+
+
+def join_page_text(pages: list) -> str:
+    """Joins the non-empty page texts the same way the original extraction loops did."""
+    return "\n".join(page_text for page_text in pages if page_text).strip()
+
+
+def format_invoice_content(extracted: dict) -> str:
+    """Renders extracted pages and tables in the layout the DataNormalizerAgent expects."""
+    text_content = join_page_text(extracted["pages"])
+    table_content = "\n".join(
+        " | ".join(row) for page_rows in extracted["tables"] for row in page_rows
+    ).strip()
+    content = f"--- TEXT CONTENT ---\n{text_content}\n--- TABLE CONTENT ---\n{table_content}"
+    return content.strip()
+
+
+class PdfExtractionPool:
+    """
+    A process pool for CPU-bound pdfplumber work.
+
+    - `max_workers`: number of worker processes (defaults to the CPU count).
+    - `max_pending`: upper bound on queued + running jobs; further submissions raise ExtractionQueueFull.
+    - `job_timeout`: seconds a caller waits for one job before ExtractionTimeout is raised;
+      the pool is then recycled so the stuck worker cannot keep its slot.
+    - `max_tasks_per_child`: a worker process is replaced after this many documents,
+      which caps the memory pdfplumber accumulates over a long-running server.
+    """
+
+    def __init__(self, max_workers: int = None, max_pending: int = None,
+                 job_timeout: float = None, max_tasks_per_child: int = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        self.job_timeout = job_timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _get_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # 'spawn' is required for max_tasks_per_child and keeps workers free of the
+                # parent's event loop and open sockets.
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+            return self._executor
+
+    def _reset_executor(self, broken: concurrent.futures.ProcessPoolExecutor):
+        with self._executor_lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _recycle_executor(self, stuck: concurrent.futures.ProcessPoolExecutor):
+        """
+        Replaces a pool whose worker is stuck on a timed-out job. A running job cannot be
+        cancelled, so the pool's processes are terminated; this fails the pool's other
+        in-flight jobs with BrokenProcessPool (which `run` retries) and frees their slots.
+        """
+        processes = list((getattr(stuck, "_processes", None) or {}).values())
+        self._reset_executor(stuck)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def _submit(self, fn, *args) -> tuple:
+        if not self._slots.acquire(blocking=False):
+            raise ExtractionQueueFull(
+                f"PDF extraction queue is full ({self.max_pending} jobs pending)."
+            )
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); start a fresh pool and retry once.
+                print("WARNING: PDF extraction pool was broken, restarting it.")
+                self._reset_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        # The slot is only freed when the worker is actually done with the job (or the pool
+        # it ran on was recycled), so timed-out jobs cannot let the backlog grow past `max_pending`.
+        future.add_done_callback(lambda _: self._slots.release())
+        return future, executor
+
+    def submit(self, fn, *args) -> concurrent.futures.Future:
+        """Queues `fn(*args)` on a worker process without waiting for the result."""
+        return self._submit(fn, *args)[0]
+
+    async def run(self, fn, *args):
+        """
+        Runs `fn(*args)` on the pool and awaits the result without blocking the event loop.
+        A job that exceeds `job_timeout` raises ExtractionTimeout and its worker is killed.
+        """
+        for attempt in range(2):
+            future, executor = self._submit(fn, *args)
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.job_timeout)
+            except asyncio.TimeoutError:
+                print(f"WARNING: PDF extraction exceeded {self.job_timeout} seconds, recycling the pool.")
+                self._recycle_executor(executor)
+                raise ExtractionTimeout(f"PDF extraction did not finish within {self.job_timeout} seconds.")
+            except BrokenProcessPool:
+                # The pool went away under this job (another job timed out, or a worker died).
+                self._reset_executor(executor)
+                if attempt:
+                    raise
+
+    async def extract(self, pdf_source: bytes | str, include_tables: bool = True) -> dict:
+        return await self.run(extract_pdf_content, pdf_source, include_tables)
+
+    def shutdown(self, wait: bool = True):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_extraction_pool() -> PdfExtractionPool:
+    """Returns the process-wide extraction pool, configured from the environment on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PdfExtractionPool(
+                max_workers=env_number("PDF_POOL_WORKERS", None),
+                max_pending=env_number("PDF_POOL_MAX_PENDING", None),
+                job_timeout=env_number("PDF_POOL_JOB_TIMEOUT", 120.0, float),
+                max_tasks_per_child=env_number("PDF_POOL_MAX_TASKS_PER_CHILD", 50),
+            )
+        return _pool
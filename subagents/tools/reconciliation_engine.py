@@ -0,0 +1,342 @@
+# subagents/tools/reconciliation_engine.py
+import asyncio
+import itertools
+import sqlite3
+import traceback
+from typing import Dict, Any
+
+import numpy as np
+from dotenv import load_dotenv
+from subagents.tools.env_settings import env_number
+from subagents.tools.db_connections import get_connection_manager
+from subagents.tools.payment_matcher import match_unassigned_payments
+from subagents.tools.emailsendertool import send_email
+load_dotenv()
+
+# A payment within this many paise of the invoice total is VERIFIED (0: amounts must be equal).
+VERDICT_TOLERANCE_MINOR = env_number("RECONCILIATION_TOLERANCE_MINOR", 0)
+
+REPORT_EMAIL_SUBJECT = "Automated Invoice Reconciliation Report"
+
+# Invoices whose result has to be recomputed: never reconciled for this date range, re-saved
+# since, or with a transaction in the range that arrived after their last run. New
+# transactions are found by a rowid range scan, so the cost follows the number of new rows.
+DIRTY_INVOICES_QUERY = """
+INSERT OR IGNORE INTO temp.dirty_invoices (invoice_number)
+SELECT i.invoice_number
+FROM invoices i
+LEFT JOIN reconciliation_watermarks w ON w.invoice_number = i.invoice_number
+WHERE w.invoice_number IS NULL
+   OR w.invoice_version != i.rowid
+   OR w.start_date != :start_date
+   OR w.end_date != :end_date
+UNION
+SELECT t.invoice_number
+FROM bank_transactions t
+JOIN reconciliation_watermarks w ON w.invoice_number = t.invoice_number
+WHERE t.rowid > (SELECT COALESCE(MIN(last_transaction_rowid), 0) FROM reconciliation_watermarks)
+  AND t.rowid > w.last_transaction_rowid
+  AND t.transaction_date BETWEEN :start_date AND :end_date
+"""
+
+# Aggregates the dirty invoices' payments, seeking each one's transactions in the index
+# (CROSS JOIN keeps the dirty set as the outer loop; the temp table has no statistics).
+# Paid amounts are summed in integer minor units (paise); the verdicts are computed by `compute_verdicts`.
+RECONCILIATION_QUERY = """
+WITH payments AS (
+    SELECT
+        t.invoice_number,
+        group_concat(t.transaction_date, ', ') AS payment_dates,
+        group_concat(t.transaction_id, ', ') AS transaction_ids,
+        SUM(CAST(ROUND(t.debit_amount * 100) AS INTEGER)) AS paid_minor
+    FROM temp.dirty_invoices d
+    CROSS JOIN bank_transactions t INDEXED BY idx_bank_transactions_reconciliation
+      ON t.invoice_number = d.invoice_number
+    WHERE t.transaction_date BETWEEN :start_date AND :end_date
+    GROUP BY t.invoice_number
+)
+SELECT
+    i.invoice_number,
+    i.vendor_name,
+    i.total_amount,
+    p.payment_dates,
+    p.transaction_ids,
+    COALESCE(p.paid_minor, 0),
+    p.invoice_number IS NOT NULL
+FROM temp.dirty_invoices d
+CROSS JOIN invoices i ON i.invoice_number = d.invoice_number
+LEFT JOIN payments p ON p.invoice_number = i.invoice_number
+"""
+
+# Copies the unchanged invoices' results from the run that computed them into the new run.
+CARRY_FORWARD_QUERY = """
+INSERT INTO reconciliation_results (
+    run_id, invoice_number, vendor_name, claimed_total, payment_dates,
+    transaction_ids, amount_paid, status, verdict, conclusion
+)
+SELECT
+    :run_id, r.invoice_number, r.vendor_name, r.claimed_total, r.payment_dates,
+    r.transaction_ids, r.amount_paid, r.status, r.verdict, r.conclusion
+FROM reconciliation_watermarks w
+JOIN invoices i ON i.invoice_number = w.invoice_number AND i.rowid = w.invoice_version
+JOIN reconciliation_results r ON r.run_id = w.run_id AND r.invoice_number = w.invoice_number
+WHERE w.invoice_number NOT IN (SELECT invoice_number FROM temp.dirty_invoices)
+"""
+
+# Verdict -> (status, conclusion template), following the reconciliation prompt's templates.
+VERDICTS = {
+    "VERIFIED":  ("PAID", "The total amount paid {paid} matches the invoice total {claimed}. This invoice is fully reconciled."),
+    "OVERPAID":  ("PAID", "The total amount paid {paid} exceeds the invoice total {claimed}. An excess of {difference} was paid."),
+    "UNDERPAID": ("DUE", "The total payment of {paid} does not cover the full invoice value {claimed}. A balance of {difference} is still due."),
+    "UNPAID":    ("DUE", "No matching payment was found in the bank records. This item is outstanding."),
+}
+
+
+def _amount_strings(minor: np.ndarray) -> list:
+    """Minor units to the report's number format: "944000" rather than "944000.0" when there are no paise."""
+    whole = minor % 100 == 0
+    return np.where(whole, (minor // 100).astype(str), (minor / 100).astype(str)).tolist()
+
+
+def to_minor_units(amounts) -> np.ndarray:
+    """
+    Rupees to paise, rounding halves away from zero like SQLite's ROUND() does for the paid
+    amounts in RECONCILIATION_QUERY, so both sides of a comparison are rounded the same way.
+    """
+    scaled = np.asarray(amounts, dtype=np.float64) * 100
+    return (np.sign(scaled) * np.floor(np.abs(scaled) + 0.5)).astype(np.int64)
+
+
+def compute_verdicts(claimed_totals: np.ndarray, paid_minor: np.ndarray, has_payment: np.ndarray,
+                     tolerance_minor: int = VERDICT_TOLERANCE_MINOR) -> dict:
+    """
+    Classifies a batch of invoices at once.
+
+    Args:
+        claimed_totals: invoice totals as stored (rupees, float).
+        paid_minor: sum of each invoice's payments in paise (0 when there are none).
+        has_payment: whether any payment was found for the invoice.
+        tolerance_minor: largest |paid - claimed| in paise that still counts as fully paid.
+
+    Returns a dict of arrays: "claimed_minor", "verdict", "status", "difference_minor"
+    (|paid - claimed|), "within_tolerance" (VERIFIED although the amounts differ) and
+    "fractional_paise" (a claimed total that is not a whole number of paise and was rounded).
+    """
+    scaled = np.asarray(claimed_totals, dtype=np.float64) * 100
+    claimed_minor = to_minor_units(claimed_totals)
+    paid_minor = np.asarray(paid_minor, dtype=np.int64)
+    has_payment = np.asarray(has_payment, dtype=bool)
+
+    delta = paid_minor - claimed_minor
+    settled = has_payment & (np.abs(delta) <= tolerance_minor)
+    verdict = np.select(
+        [~has_payment, settled, delta > 0],
+        ["UNPAID", "VERIFIED", "OVERPAID"],
+        default="UNDERPAID",
+    )
+    return {
+        "claimed_minor": claimed_minor,
+        "verdict": verdict,
+        "status": np.where(settled | (has_payment & (delta > 0)), "PAID", "DUE"),
+        "difference_minor": np.abs(delta),
+        "within_tolerance": settled & (delta != 0),
+        "fractional_paise": np.abs(scaled - claimed_minor) > 1e-6,
+    }
+
+
+def save_verdicts(conn: sqlite3.Connection, run_id: str, rows: list) -> dict:
+    """
+    Classifies the aggregated rows of `RECONCILIATION_QUERY` with `compute_verdicts` and
+    bulk-inserts them into `reconciliation_results`. Returns the verdict arrays.
+    """
+    if not rows:
+        return compute_verdicts(np.empty(0), np.empty(0, dtype=np.int64), np.empty(0, dtype=bool))
+    invoice_numbers, vendor_names, claimed_totals, payment_dates, transaction_ids, paid_minor, has_payment = zip(*rows)
+    paid_minor = np.array(paid_minor, dtype=np.int64)
+    verdicts = compute_verdicts(np.array(claimed_totals, dtype=np.float64), paid_minor, np.array(has_payment, dtype=bool))
+
+    claimed = _amount_strings(verdicts["claimed_minor"])
+    paid = _amount_strings(paid_minor)
+    difference = _amount_strings(verdicts["difference_minor"])
+    verdict = verdicts["verdict"].tolist()
+    conclusions = [
+        VERDICTS[v][1].format(paid=p, claimed=c, difference=d)
+        for v, p, c, d in zip(verdict, paid, claimed, difference)
+    ]
+    # Stored as numbers; the NUMERIC columns keep whole amounts as integers.
+    claimed_total = (verdicts["claimed_minor"] / 100).tolist()
+    amount_paid = np.where(verdicts["verdict"] == "UNPAID", None, paid_minor / 100).tolist()
+
+    conn.executemany("""
+        INSERT INTO reconciliation_results (
+            run_id, invoice_number, vendor_name, claimed_total, payment_dates,
+            transaction_ids, amount_paid, status, verdict, conclusion
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, zip(
+        itertools.repeat(run_id), invoice_numbers, vendor_names, claimed_total, payment_dates,
+        transaction_ids, amount_paid, verdicts["status"].tolist(), verdict, conclusions
+    ))
+    return verdicts
+
+
+def _entry_from_result(invoice_number: str, vendor_name: str, claimed_total, payment_dates: str | None,
+                       transaction_ids: str | None, amount_paid, status: str, verdict: str, conclusion: str) -> dict:
+    """Turns a stored `reconciliation_results` row back into its `audit_report` entry."""
+    paid = verdict != "UNPAID"
+    return {
+        "invoice_number": invoice_number,
+        "vendor_name": vendor_name,
+        "claimed_total": claimed_total,
+        "payment_dates": payment_dates.split(", ") if paid else "N/A",
+        "transaction_ids": transaction_ids.split(", ") if paid else "N/A",
+        "amount_paid": amount_paid if paid else "N/A",
+        "status": status,
+        "verdict": verdict,
+        "conclusion": conclusion,
+    }
+
+
+def _load_results(conn: sqlite3.Connection, run_id: str) -> list:
+    return [
+        _entry_from_result(*row) for row in conn.execute("""
+            SELECT invoice_number, vendor_name, claimed_total, payment_dates, transaction_ids,
+                   amount_paid, status, verdict, conclusion
+            FROM reconciliation_results WHERE run_id = ? ORDER BY invoice_number
+        """, (run_id,))
+    ]
+
+
+def load_audit_report(conn: sqlite3.Connection, run_id: str) -> list | None:
+    """The `audit_report` entries stored for `run_id`, or None when no reconciliation ran under it."""
+    if conn.execute("SELECT 1 FROM reconciliation_runs WHERE run_id = ?", (run_id,)).fetchone() is None:
+        return None
+    return _load_results(conn, run_id)
+
+
+def reconcile_run(conn: sqlite3.Connection, start_date: str, end_date: str, run_id: str,
+                  incremental: bool = True) -> list:
+    """
+    Reconciles every invoice against the bank transactions dated between `start_date`
+    and `end_date` (inclusive, YYYY-MM-DD), stores the results under `run_id` and
+    records the run in `reconciliation_runs`. The database must be migrated; the caller commits.
+
+    With `incremental`, only invoices whose inputs changed since their last reconciliation
+    over the same date range are recomputed; the others' results are carried forward.
+
+    Returns the `audit_report` entries, ordered by invoice number.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS dirty_invoices (invoice_number TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.dirty_invoices")
+
+    params = {"start_date": start_date, "end_date": end_date, "run_id": run_id}
+    last_transaction_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM bank_transactions").fetchone()[0]
+
+    # 1. Find the invoices to recompute
+    if incremental:
+        conn.execute(DIRTY_INVOICES_QUERY, params)
+    else:
+        conn.execute("INSERT INTO temp.dirty_invoices (invoice_number) SELECT invoice_number FROM invoices")
+    recomputed = conn.execute("SELECT COUNT(*) FROM temp.dirty_invoices").fetchone()[0]
+
+    # 2. Recompute them and carry the rest forward into the new run
+    verdicts = save_verdicts(conn, run_id, conn.execute(RECONCILIATION_QUERY, params).fetchall())
+    if verdicts["within_tolerance"].any():
+        print(f"--- {int(verdicts['within_tolerance'].sum())} invoices verified within the "
+              f"{VERDICT_TOLERANCE_MINOR} paise tolerance. ---")
+    if verdicts["fractional_paise"].any():
+        print(f"WARNING: {int(verdicts['fractional_paise'].sum())} invoice totals are not whole paise and were rounded.")
+    if incremental:
+        conn.execute(CARRY_FORWARD_QUERY, params)
+
+    # 3. Move the watermarks: every result now lives in this run and has seen every transaction
+    conn.execute("DELETE FROM reconciliation_watermarks WHERE invoice_number NOT IN (SELECT invoice_number FROM invoices)")
+    conn.execute("""
+        INSERT OR REPLACE INTO reconciliation_watermarks (
+            invoice_number, start_date, end_date, invoice_version, last_transaction_rowid, run_id
+        )
+        SELECT i.invoice_number, :start_date, :end_date, i.rowid, :last_transaction_rowid, :run_id
+        FROM temp.dirty_invoices d
+        JOIN invoices i ON i.invoice_number = d.invoice_number
+    """, {**params, "last_transaction_rowid": last_transaction_rowid})
+    conn.execute(
+        "UPDATE reconciliation_watermarks SET last_transaction_rowid = ?, run_id = ?",
+        (last_transaction_rowid, run_id)
+    )
+
+    audit_report = _load_results(conn, run_id)
+    conn.execute(
+        "INSERT INTO reconciliation_runs (run_id, start_date, end_date, status, no_of_invoices) VALUES (?, ?, ?, ?, ?)",
+        (run_id, start_date, end_date, "COMPLETED", len(audit_report))
+    )
+    print(f"--- Recomputed {recomputed} of {len(audit_report)} invoices; the rest were carried forward. ---")
+    return audit_report
+
+
+def _reconcile(start_date: str, end_date: str, run_id: str) -> dict:
+    with get_connection_manager().write() as conn:
+        audit_report = reconcile_run(conn, start_date, end_date, run_id)
+        candidate_matches = match_unassigned_payments(conn, run_id, start_date, end_date)
+    verdicts = {}
+    for entry in audit_report:
+        verdicts[entry["verdict"]] = verdicts.get(entry["verdict"], 0) + 1
+    return {
+        "run_id": run_id,
+        "no_of_invoices": len(audit_report),
+        "verdicts": verdicts,
+        "candidate_matches": len(candidate_matches),
+    }
+
+
+async def reconcile_transactions(start_date: str, end_date: str, run_id: str) -> Dict[str, Any]:
+    """
+    Reconciles all invoices in the database against the bank transactions dated between
+    `start_date` and `end_date`, and saves the results under a run ID. Invoices whose inputs
+    did not change since the last run over the same dates keep their previous result.
+    The report itself stays in the database; only a summary is returned.
+
+    Args:
+        start_date (str): First transaction date to include, as YYYY-MM-DD.
+        end_date (str): Last transaction date to include, as YYYY-MM-DD.
+        run_id (str): The run ID to store the results under.
+
+    Returns a status dictionary with:
+        - "success" (bool): True if the reconciliation completed, False otherwise.
+        - "data" (dict or None): {"run_id": str, "no_of_invoices": int, "verdicts": {verdict: count},
+          "candidate_matches": int}. `candidate_matches` is the number of open invoices proposed for
+          transactions without a usable invoice number; they are saved for a reviewer and do not
+          change the verdicts.
+        - "error" (str or None): Error message if failure occurred.
+    """
+    print(f"--- [Tool] Reconciling invoices against transactions from {start_date} to {end_date} ---")
+    try:
+        # The engine runs on a worker thread, so the event loop is free while it holds the write lock.
+        summary = await asyncio.to_thread(_reconcile, start_date, end_date, run_id)
+        print(f"--- Reconciled {summary['no_of_invoices']} invoices under run {run_id}. ---")
+        return {"success": True, "data": summary, "error": None}
+
+    except sqlite3.Error as e:
+        print(f"FATAL DATABASE ERROR during reconciliation: {e}")
+        traceback.print_exc()
+        return {"success": False, "data": None, "error": str(e)}
+
+
+def _load_audit_report(run_id: str) -> list | None:
+    with get_connection_manager().read() as conn:
+        return load_audit_report(conn, run_id)
+
+
+async def send_reconciliation_report(run_id: str) -> dict:
+    """
+    Emails the audit report saved under `run_id` by `reconcile_transactions`.
+
+    Args:
+        run_id (str): The run ID the results were saved under.
+
+    Returns:
+        dict: A dictionary indicating success or failure with a status message.
+    """
+    print(f"--- [Tool] Emailing the reconciliation report of run {run_id} ---")
+    audit_report = await asyncio.to_thread(_load_audit_report, run_id)
+    if audit_report is None:
+        return {"status": f"Error: no reconciliation results found for run {run_id}"}
+    return await asyncio.to_thread(send_email, REPORT_EMAIL_SUBJECT, audit_report)
@@ -1,100 +0,0 @@
-# subagents/tools/reconciliation_tools.py
-import os, io, json
-from google.cloud.storage import Client
-import pdfplumber
-from datetime import datetime 
-import re
-from dotenv import load_dotenv
-load_dotenv()
-
-def get_all_invoice_jsons() -> str:
-    """
-    Finds all processed invoice JSON files and returns them as a single JSON list string.
-    """
-    print("--- [Tool] Fetching all processed invoice JSONs... ---")
-    try:
-        client = Client.from_service_account_json(os.getenv("gcp_credentials_path"))
-        bucket = client.bucket(os.getenv("TARGET_BUCKET"))
-        blobs = [b for b in bucket.list_blobs() if b.name.endswith('.json')]
-        if not blobs: return "[]"
-        all_invoices = [json.loads(blob.download_as_string()) for blob in blobs]
-        return json.dumps(all_invoices)
-    except Exception as e:
-        return f'{{"error": "Error fetching invoice JSONs: {str(e)}"}}'
-
-def extract_text_from_bank_statement() -> str:
-    """
-    Finds the bank statement in GCS, extracts all text, and returns it as a string.
-    """
-    print("--- [Tool] Extracting text from bank statement PDF... ---")
-    try:
-        client = Client.from_service_account_json(os.getenv("gcp_credentials_path"))
-        bucket = client.bucket(os.getenv("BANK_STATEMENT_BUCKET"))
-        blobs = list(bucket.list_blobs())
-        if not blobs: return "Error: No bank statement file found."
-        
-        content = blobs[0].download_as_bytes()
-        full_text = ""
-        with pdfplumber.open(io.BytesIO(content)) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text: full_text += page_text + "\n"
-        return full_text.strip()
-    except Exception as e:
-        return f"Error extracting text from PDF: {str(e)}"
-def parse_bank_statement_text(bank_statement_text: str) -> dict:
-    """
-    Parses raw text from a bank statement to extract transaction details.
-
-    Args:
-        bank_statement_text: The full text content of the bank statement.
-
-    Returns:
-        A dictionary structured as {"transactions": [...]}.
-    """
-    transactions = []
-    
-    pattern = re.compile(
-        r"^(\d{2}-\d{2}-\d{4})\s+"    # 1: Date
-        r"(\w+)\s+"                  # 2: Transaction ID
-        r"([\w/]+)\s+"               # 3: Invoice Number
-        r"(.+?)\s+"                  # 4: Description (non-greedy)
-        r"([\d,]+)\s+"               # 5: Debit Amount
-        r"([\d,]+)$",                # 6: Balance (we capture it to end the match)
-        re.MULTILINE                 # Process line by line
-    )
-
-    lines = bank_statement_text.strip().split('\n')
-    for line in lines:
-        match = pattern.search(line.strip())
-        if match:
-            # Extract data from the matched groups
-            date_str = match.group(1)
-            transaction_id = match.group(2)
-            invoice_number = match.group(3)
-            description = match.group(4)
-            debit_str = match.group(5)
-            
-            # --- Clean and format the extracted data ---
-            try:
-                # 1. Format date from DD-MM-YYYY to YYYY-MM-DD
-                formatted_date = datetime.strptime(date_str, '%d-%m-%Y').strftime('%Y-%m-%d')
-                
-                # 2. Convert debit amount string to a number (float)
-                # Note: Your example output showed a string, but a number is more useful.
-                # If you absolutely need a string, use str(debit_amount_float)
-                debit_amount_float = float(debit_str.replace(",", ""))
-
-                transactions.append({
-                    "transaction_id": transaction_id,
-                    "invoice_number": invoice_number,
-                    "description": description.strip(),
-                    "transaction_date": formatted_date,
-                    "debit_amount": debit_amount_float 
-                })
-            except (ValueError, IndexError) as e:
-                print(f"Skipping malformed line: '{line}'. Error: {e}")
-
-    return {"transactions": transactions}
-
-
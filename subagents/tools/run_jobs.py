@@ -0,0 +1,234 @@
+# subagents/tools/run_jobs.py
+"""
+Background execution of reconciliation runs.
+
+`/api/run` submits a job and returns its run_id at once. A fixed number of worker tasks take
+jobs from a bounded queue, so at most RUN_JOB_CONCURRENCY agent pipelines run at a time.
+While a job runs, the ADK events it sees are turned into progress events (agent transitions,
+tool calls, per-stage timings) that clients can follow over SSE or poll as a status snapshot.
+
+Jobs may carry a request key. While a job with a key is queued, running or kept as a completed
+job, `find()` returns it for that key, so identical requests share one run (single flight).
+"""
+import json
+import time
+import asyncio
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from subagents.tools.env_settings import env_number
+load_dotenv()
+
+# Agent pipelines running at the same time, and jobs allowed to wait for one of them.
+RUN_JOB_CONCURRENCY = env_number("RUN_JOB_CONCURRENCY", 2)
+RUN_JOB_MAX_QUEUED = env_number("RUN_JOB_MAX_QUEUED", 20)
+# Finished jobs kept in memory for status and event requests (completed runs are also in run_reports).
+RUN_JOB_HISTORY = env_number("RUN_JOB_HISTORY", 200)
+# Seconds between SSE keep-alive comments while a job is quiet, so proxies keep the stream open.
+RUN_JOB_KEEPALIVE_SECONDS = env_number("RUN_JOB_KEEPALIVE_SECONDS", 15, float)
+
+QUEUED, RUNNING, COMPLETED, FAILED = "QUEUED", "RUNNING", "COMPLETED", "FAILED"
+
+
+class RunQueueFull(Exception):
+    """Raised when RUN_JOB_MAX_QUEUED jobs are already waiting for a worker."""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class RunJob:
+    """One reconciliation run: its state, its progress events and, once finished, its result or error."""
+
+    def __init__(self, run_id: str, start_date: str, end_date: str, execute, key: tuple = None):
+        self.run_id = run_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.execute = execute
+        self.key = key
+        self.status = QUEUED
+        self.queued_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.current_agent = None
+        self.stages = []
+        self.events = []
+        self._started = None
+        self._stage_started = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def publish(self, event_type: str, data: dict):
+        self.events.append((event_type, data))
+        # Wake every follower; the next publish waits on a fresh event.
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def record_adk_event(self, event):
+        """Publishes the progress an ADK event shows: a new agent taking over, tool calls and tool results."""
+        agent = getattr(event, "author", None)
+        if agent and agent != self.current_agent:
+            self._end_stage()
+            self.current_agent, self._stage_started = agent, time.monotonic()
+            self.publish("agent_started", {"agent": agent})
+        for call in event.get_function_calls() or []:
+            self.publish("tool_call", {"agent": agent, "tool": call.name})
+        for response in event.get_function_responses() or []:
+            self.publish("tool_result", {"agent": agent, "tool": response.name})
+
+    def _end_stage(self):
+        if self.current_agent is None:
+            return
+        stage = {"agent": self.current_agent, "duration_ms": round((time.monotonic() - self._stage_started) * 1000)}
+        self.stages.append(stage)
+        self.publish("stage_completed", stage)
+
+    def _start(self):
+        self.status, self.started_at, self._started = RUNNING, _now(), time.monotonic()
+        self.publish("status", {"status": RUNNING})
+
+    def _finish(self, status: str, result=None, error: str = None):
+        self._end_stage()
+        self.current_agent = None
+        self.status, self.finished_at = status, _now()
+        self.result, self.error = result, error
+        elapsed = round((time.monotonic() - self._started) * 1000) if self._started else 0
+        if status == COMPLETED:
+            self.publish("completed", {"status": status, "duration_ms": elapsed, "result": result})
+        else:
+            self.publish("failed", {"status": status, "duration_ms": elapsed, "error": error})
+
+    def snapshot(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "status": self.status,
+            "queued_at": self.queued_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "current_agent": self.current_agent,
+            "stages": self.stages,
+            "result": self.result,
+            "error": self.error,
+        }
+
+    async def follow(self, after: int = 0, keepalive: float = RUN_JOB_KEEPALIVE_SECONDS):
+        """
+        Yields (event id, type, data) for every event after id `after`, as they are published,
+        until the job has finished. Yields None when nothing happened for `keepalive` seconds.
+        """
+        seen = max(0, after)
+        while True:
+            changed = self._changed
+            while seen < len(self.events):
+                seen += 1
+                yield (seen, *self.events[seen - 1])
+            if self.finished:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), keepalive)
+            except asyncio.TimeoutError:
+                yield None
+
+    async def sse(self, after: int = 0):
+        """`follow` formatted as a text/event-stream; the ids let a client resume with Last-Event-ID."""
+        async for item in self.follow(after):
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            event_id, event_type, data = item
+            yield f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+class RunJobManager:
+    """
+    A bounded queue of run jobs and the worker tasks that execute them.
+    A job's `execute(job)` coroutine runs the pipeline, reporting progress through
+    `job.record_adk_event`, and returns the result; an exception fails the job.
+    """
+
+    def __init__(self, concurrency: int = RUN_JOB_CONCURRENCY, max_queued: int = RUN_JOB_MAX_QUEUED,
+                 history: int = RUN_JOB_HISTORY):
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+        self.history = history
+        self.jobs = {}
+        self._by_key = {}
+        self._queue = None
+        self._workers = []
+
+    async def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"run-job-worker-{i}") for i in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        """Cancels the workers; jobs still queued or running are marked FAILED."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in self.jobs.values():
+            if not job.finished:
+                job._finish(FAILED, error="The server shut down before the run finished.")
+
+    def submit(self, run_id: str, start_date: str, end_date: str, execute, key: tuple = None) -> RunJob:
+        if not self._workers:
+            raise RuntimeError("The run job manager is not running.")
+        job = RunJob(run_id, start_date, end_date, execute, key)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise RunQueueFull(f"Reconciliation queue is full ({self.max_queued} runs waiting).")
+        self.jobs[run_id] = job
+        if key is not None:
+            self._by_key[key] = job
+        job.publish("status", {"status": QUEUED, "position": self._queue.qsize()})
+        return job
+
+    def get(self, run_id: str) -> RunJob | None:
+        return self.jobs.get(run_id)
+
+    def find(self, key: tuple) -> RunJob | None:
+        """The queued, running or completed job submitted with `key`; a failed one is not reused."""
+        job = self._by_key.get(key)
+        return job if job is not None and job.status != FAILED else None
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            job._start()
+            try:
+                job._finish(COMPLETED, result=await job.execute(job))
+            except asyncio.CancelledError:
+                job._finish(FAILED, error="The server shut down before the run finished.")
+                raise
+            except Exception as e:
+                print(f"Reconciliation run {job.run_id} failed: {e}")
+                job._finish(FAILED, error=str(e))
+            finally:
+                self._forget_finished()
+
+    def _forget_finished(self):
+        finished = [run_id for run_id, job in self.jobs.items() if job.finished]
+        for run_id in finished[:max(0, len(finished) - self.history)]:
+            job = self.jobs.pop(run_id)
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+
+_manager = RunJobManager()
+
+def get_run_job_manager() -> RunJobManager:
+    """Returns the process-wide run job manager; it is started and stopped by the API's lifespan."""
+    return _manager
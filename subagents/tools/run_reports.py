@@ -0,0 +1,141 @@
+# subagents/tools/run_reports.py
+"""
+The `run_reports` table: the parsed audit report of every completed run.
+
+Reports are saved when a run completes. Runs completed before the table existed are filled in
+from their latest session event by `backfill_run_reports()`, which the API runs at startup and
+which can be run by hand with `python -m subagents.tools.run_reports`.
+
+Reports of runs queued by `/api/run` also hold the run's request key (date range and data
+version), so an identical later request can be answered with the stored run.
+"""
+import sys
+import json
+import sqlite3
+
+from dotenv import load_dotenv
+from subagents.tools.env_settings import env_str
+from subagents.tools.db_connections import get_connection_manager
+load_dotenv()
+
+# All reports as one JSON array, built by SQLite: the stored reports are never decoded in Python.
+ALL_RUN_REPORTS_JSON_QUERY = """
+SELECT COALESCE(json_group_array(json_object('run_id', run_id, 'audit_report', json(audit_report))), '[]')
+FROM (SELECT run_id, audit_report FROM run_reports ORDER BY rowid)
+"""
+
+MISSING_RUN_REPORTS_QUERY = """
+SELECT s.runID, s.sessionID FROM runsessions s
+WHERE NOT EXISTS (SELECT 1 FROM run_reports r WHERE r.run_id = s.runID)
+ORDER BY s.rowid
+"""
+
+# The newest completed run for a (start_date, end_date, transactions_version, invoices_version) key.
+COMPLETED_RUN_QUERY = """
+SELECT run_id FROM run_reports
+WHERE start_date = ? AND end_date = ? AND transactions_version = ? AND invoices_version = ?
+ORDER BY rowid DESC LIMIT 1
+"""
+
+LATEST_EVENT_QUERY = "SELECT content FROM events WHERE session_id = ? ORDER BY timestamp DESC LIMIT 1"
+
+
+def save_run_report(conn: sqlite3.Connection, run_id: str, session_id: str, audit_report, request_key: tuple = None) -> bool:
+    """
+    Stores a run's audit report (replacing an earlier one), with the `request_key` the run was
+    queued under, if any. The caller commits. Returns False when there is no report.
+    """
+    if audit_report is None:
+        return False
+    start_date, end_date, transactions_version, invoices_version = request_key or (None,) * 4
+    conn.execute(
+        "INSERT OR REPLACE INTO run_reports "
+        "(run_id, session_id, audit_report, start_date, end_date, transactions_version, invoices_version) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (run_id, session_id, json.dumps(audit_report), start_date, end_date, transactions_version, invoices_version)
+    )
+    return True
+
+
+def data_version(conn: sqlite3.Connection) -> tuple:
+    """
+    (highest bank transaction rowid, highest invoice rowid): changes whenever a transaction is
+    added or an invoice is added or re-saved (INSERT OR REPLACE gives it a new rowid).
+    """
+    return (
+        conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM bank_transactions").fetchone()[0],
+        conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM invoices").fetchone()[0],
+    )
+
+
+def run_request_key(conn: sqlite3.Connection, start_date: str, end_date: str) -> tuple:
+    """The key identical run requests share: the normalized date range and the current data version."""
+    return (start_date, end_date, *data_version(conn))
+
+
+def find_completed_run(conn: sqlite3.Connection, request_key: tuple) -> str | None:
+    """The run_id of the newest stored run made for `request_key`, if any."""
+    row = conn.execute(COMPLETED_RUN_QUERY, request_key).fetchone()
+    return row[0] if row else None
+
+
+def load_run_report(conn: sqlite3.Connection, run_id: str):
+    """The stored audit report of a run, or None when the run has none."""
+    row = conn.execute("SELECT audit_report FROM run_reports WHERE run_id = ?", (run_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def audit_report_from_event(content: str):
+    """The `audit_report` of a final agent event's `content`, or None when the event does not hold one."""
+    try:
+        content_data = json.loads(content)
+        text = json.loads(content_data["parts"][0]["text"])
+        return text["audit_report"]
+    except (TypeError, ValueError, KeyError, IndexError):
+        return None
+
+
+def backfill_run_reports(sessions_path: str = None) -> int:
+    """
+    Saves the report of every run in `runsessions` that has none yet, read from the run's
+    latest event in sessions.db. Runs whose event holds no report are skipped.
+    Returns the number of reports saved.
+    """
+    sessions_path = sessions_path or env_str("SESSIONS_DB_PATH", "sessions.db")
+    manager = get_connection_manager()
+    with manager.read() as conn:
+        missing = conn.execute(MISSING_RUN_REPORTS_QUERY).fetchall()
+    if not missing:
+        return 0
+
+    sessions = sqlite3.connect(sessions_path)
+    try:
+        if sessions.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events'").fetchone() is None:
+            print(f"--- Run report backfill: no events table in {sessions_path}, {len(missing)} runs skipped ---")
+            return 0
+        reports = []
+        for run_id, session_id in missing:
+            event = sessions.execute(LATEST_EVENT_QUERY, (session_id,)).fetchone()
+            audit_report = audit_report_from_event(event[0]) if event else None
+            if audit_report is None:
+                print(f"--- Run report backfill: no audit report found for run {run_id} ---")
+                continue
+            reports.append((run_id, session_id, audit_report))
+    finally:
+        sessions.close()
+
+    with manager.write() as conn:
+        for run_id, session_id, audit_report in reports:
+            save_run_report(conn, run_id, session_id, audit_report)
+    print(f"--- Run report backfill: saved {len(reports)} of {len(missing)} missing reports ---")
+    return len(reports)
+
+
+def all_run_reports_json(conn: sqlite3.Connection) -> str:
+    """Every run's report as a JSON array of {"run_id", "audit_report"}, oldest run first."""
+    return conn.execute(ALL_RUN_REPORTS_JSON_QUERY).fetchone()[0]
+
+
+if __name__ == "__main__":
+    # python -m subagents.tools.run_reports [sessions.db]
+    backfill_run_reports(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,79 @@
+# subagents/tools/upload_buffer.py
+import os
+import asyncio
+import hashlib
+import tempfile
+
+# Uploads are read from the request in chunks of this size when spooling to disk
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadBuffer:
+    """
+    Holds the content of one uploaded PDF exactly once.
+
+    Files up to `max_memory_bytes` are kept as a single bytes object; larger files are
+    streamed chunk by chunk into a named temp file and never held in memory as a whole.
+    The SHA-256 is computed while reading, so the extraction cache needs no second pass.
+
+    `source` is what PDF consumers should be given: the bytes for small files, the temp
+    file path for large ones. Pool workers open the path themselves instead of receiving
+    a pickled copy, and the GCS upload streams from the same file.
+    """
+
+    def __init__(self, filename: str, content_type: str, data: bytes = None,
+                 path: str = None, size: int = 0, sha256: str = None):
+        self.filename = filename
+        self.content_type = content_type
+        self.data = data
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    @classmethod
+    async def from_upload(cls, file, max_memory_bytes: int) -> "UploadBuffer":
+        """Reads a FastAPI UploadFile once, keeping it in memory or spooling it to disk by size."""
+        hasher = hashlib.sha256()
+        head = await file.read(max_memory_bytes + 1)
+        hasher.update(head)
+
+        if len(head) <= max_memory_bytes:
+            return cls(file.filename, file.content_type, data=head,
+                       size=len(head), sha256=hasher.hexdigest())
+
+        fd, path = tempfile.mkstemp(prefix="upload-", suffix=".pdf")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as spool:
+                chunk = head
+                while chunk:
+                    await asyncio.to_thread(spool.write, chunk)
+                    size += len(chunk)
+                    chunk = await file.read(SPOOL_CHUNK_SIZE)
+                    hasher.update(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return cls(file.filename, file.content_type, path=path,
+                   size=size, sha256=hasher.hexdigest())
+
+    @property
+    def source(self) -> bytes | str:
+        return self.path if self.path else self.data
+
+    def upload_to_blob(self, blob):
+        """Uploads the content to a GCS blob; blocking, so call it off the event loop."""
+        if self.path:
+            blob.upload_from_filename(self.path, content_type=self.content_type)
+        else:
+            blob.upload_from_string(self.data, content_type=self.content_type)
+
+    def close(self):
+        """Releases the in-memory content or deletes the temp file."""
+        self.data = None
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
@@ -0,0 +1,158 @@
+# subagents/tools/write_queue.py
+import time
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from subagents.tools.env_settings import env_number
+from subagents.tools.db_connections import get_connection_manager
+load_dotenv()
+
+# A group commit is written once it holds this many rows...
+WRITE_QUEUE_MAX_ROWS = env_number("WRITE_QUEUE_MAX_ROWS", 5000)
+# ...or this long after its first request arrived, whichever comes first.
+WRITE_QUEUE_MAX_DELAY_MS = env_number("WRITE_QUEUE_MAX_DELAY_MS", 10, float)
+# Requests waiting to be written before submitters are made to wait.
+WRITE_QUEUE_MAX_PENDING = env_number("WRITE_QUEUE_MAX_PENDING", 1000)
+
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    A background task that owns the database writes of the API process.
+
+    Callers submit (insert statement, rows) requests and await their own result. The task
+    gathers the requests that arrive within WRITE_QUEUE_MAX_DELAY_MS (up to WRITE_QUEUE_MAX_ROWS
+    rows) and writes them in one transaction on the shared writer connection, so a burst of
+    uploads costs one commit instead of one each. Every request runs under its own savepoint:
+    a request that fails is rolled back and gets the error, the others are still committed.
+
+    Batches are written on a thread of the queue's own. Callers of `submit_threadsafe` block
+    threads of the default executor while they wait, so a writer borrowed from that executor
+    could wait forever behind them.
+    """
+
+    def __init__(self, max_rows: int = WRITE_QUEUE_MAX_ROWS, max_delay_ms: float = WRITE_QUEUE_MAX_DELAY_MS,
+                 max_pending: int = WRITE_QUEUE_MAX_PENDING):
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self.max_pending = max_pending
+        self.commits = 0
+        self.requests = 0
+        self._queue = None
+        self._task = None
+        self._loop = None
+        self._loop_thread = None
+        self._executor = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database-writer")
+        self._task = asyncio.create_task(self._run(), name="database-write-queue")
+
+    async def stop(self):
+        """Writes what is already queued, then stops the task."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        self._executor.shutdown()
+        self._executor = None
+
+    async def submit(self, insert_sql: str, rows: list) -> int:
+        """Queues rows for the next group commit; returns how many of them were written."""
+        if not self.running:
+            raise RuntimeError("The write queue is not running.")
+        future = self._loop.create_future()
+        await self._queue.put((insert_sql, rows, future))
+        return await future
+
+    def submit_threadsafe(self, insert_sql: str, rows: list) -> int | None:
+        """
+        `submit` for synchronous code running on another thread (e.g. under asyncio.to_thread).
+        Returns None, without writing, when the queue cannot be used from the calling thread;
+        the caller then writes directly.
+        """
+        if not self.running or threading.get_ident() == self._loop_thread:
+            return None
+        return asyncio.run_coroutine_threadsafe(self.submit(insert_sql, rows), self._loop).result()
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            request = await self._queue.get()
+            if request is _STOP:
+                break
+            batch = [request]
+            rows = len(request[1])
+            deadline = time.monotonic() + self.max_delay
+
+            # Gather more requests until the batch is full or the delay has passed
+            while rows < self.max_rows:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if request is _STOP:
+                    stopping = True
+                    break
+                batch.append(request)
+                rows += len(request[1])
+
+            try:
+                outcomes = await self._loop.run_in_executor(self._executor, self._write_batch, batch)
+            except Exception as e:
+                # The group commit itself failed (a database error, or e.g. a TypeError from a bad
+                # row): nothing in the batch was written, and the queue keeps serving later requests.
+                print(f"FATAL DATABASE ERROR in write queue: {e}")
+                outcomes = [e] * len(batch)
+
+            for (_, _, future), outcome in zip(batch, outcomes):
+                if future.done():
+                    continue  # the submitter gave up waiting
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
+
+    def _write_batch(self, batch: list) -> list:
+        """Writes every request of a batch in one transaction; returns a row count or an exception per request."""
+        outcomes = []
+        with get_connection_manager().write() as conn:
+            conn.execute("BEGIN")
+            for insert_sql, rows, _ in batch:
+                conn.execute("SAVEPOINT write_request")
+                changes_before = conn.total_changes
+                try:
+                    conn.executemany(insert_sql, rows)
+                    conn.execute("RELEASE write_request")
+                    outcomes.append(conn.total_changes - changes_before)
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO write_request")
+                    conn.execute("RELEASE write_request")
+                    outcomes.append(e)
+        self.commits += 1
+        self.requests += len(batch)
+        return outcomes
+
+
+_write_queue = WriteQueue()
+
+def get_write_queue() -> WriteQueue:
+    """Returns the process-wide write queue; it is started and stopped by the API's lifespan."""
+    return _write_queue
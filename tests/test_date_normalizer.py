@@ -0,0 +1,26 @@
+# tests/test_date_normalizer.py
+from subagents.tools.date_normalizer import DateNormalizer
+
+
+def test_ambiguous_date_does_not_depend_on_history():
+    fresh = DateNormalizer()
+    used = DateNormalizer()
+    used.normalize("03-04-2025", source="Acme")
+    used.normalize("12-25-2025", source="Acme")
+    assert used.learned_format("Acme") == "%m-%d-%Y"
+    assert used.normalize("03-04-2025", source="Acme") == fresh.normalize("03-04-2025", source="Acme") == "2025-04-03"
+
+
+def test_only_unambiguous_dates_are_learned():
+    normalizer = DateNormalizer()
+    normalizer.normalize("03-04-2025", source="Acme")
+    assert normalizer.learned_format("Acme") is None
+    normalizer.normalize("2025-04-03", source="Acme")
+    assert normalizer.learned_format("Acme") == "%Y-%m-%d"
+
+
+def test_learned_format_reads_unambiguous_dates():
+    normalizer = DateNormalizer()
+    normalizer.normalize("12-25-2025", source="Acme")
+    assert normalizer.normalize("01-31-2025", source="Acme") == "2025-01-31"
+    assert normalizer.normalize("31-01-2025", source="Acme") == "2025-01-31"
@@ -0,0 +1,16 @@
+# tests/test_env_settings.py
+from subagents.tools.env_settings import env_number, env_str
+
+
+def test_empty_value_uses_the_default(monkeypatch):
+    monkeypatch.setenv("TEST_SETTING", "")
+    assert env_number("TEST_SETTING", 8) == 8
+    assert env_number("TEST_SETTING", 1.5, float) == 1.5
+    assert env_str("TEST_SETTING", "database.db") == "database.db"
+
+
+def test_set_and_invalid_values(monkeypatch):
+    monkeypatch.setenv("TEST_SETTING", "12")
+    assert env_number("TEST_SETTING", 8) == 12
+    monkeypatch.setenv("TEST_SETTING", "twelve")
+    assert env_number("TEST_SETTING", 8) == 8
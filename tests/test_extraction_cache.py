@@ -0,0 +1,44 @@
+# tests/test_extraction_cache.py
+import asyncio
+
+import pytest
+
+from subagents.tools import extraction_cache
+from subagents.tools.extraction_cache import ExtractionCache, extract_pdf_cached
+
+
+class FakePool:
+    def __init__(self):
+        self.calls = []
+
+    async def extract(self, pdf_source, include_tables=True):
+        self.calls.append(include_tables)
+        return {"pages": ["text"], "tables": [[["cell"]] if include_tables else []]}
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(extraction_cache, "_cache", ExtractionCache(str(tmp_path / "cache.db"), 1024 * 1024))
+    monkeypatch.setattr(extraction_cache, "get_extraction_pool", lambda: pool)
+    return pool
+
+
+def test_text_only_extraction_skips_tables(pool):
+    async def main():
+        first = await extract_pdf_cached(b"%PDF statement", include_tables=False)
+        second = await extract_pdf_cached(b"%PDF statement", include_tables=False)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert pool.calls == [False]
+    assert first == second == {"pages": ["text"], "tables": [[]]}
+
+
+def test_text_only_request_reuses_an_entry_with_tables(pool):
+    async def main():
+        await extract_pdf_cached(b"%PDF invoice")
+        return await extract_pdf_cached(b"%PDF invoice", include_tables=False)
+
+    assert asyncio.run(main())["tables"] == [[["cell"]]]
+    assert pool.calls == [True]
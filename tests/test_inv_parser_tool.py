@@ -0,0 +1,30 @@
+# tests/test_inv_parser_tool.py
+from subagents.tools.inv_parser_tool import extract_invoice_data_from_text
+
+
+def test_value_may_contain_another_fields_label():
+    data = extract_invoice_data_from_text("Vendor: Acme Invoice Date: 05-05-2025\n")
+    assert data["invoice_date"] == "2025-05-05"
+
+
+def test_variant_label_needs_a_colon():
+    data = extract_invoice_data_from_text("Supplier Details\nCustomer ID: 42\n")
+    assert data["vendor_name"] is None
+    assert data["client_name"] is None
+
+
+def test_variant_label_with_colon():
+    data = extract_invoice_data_from_text("Supplier: Acme Corp\nBill To:\nBeta Ltd\nGrand Total: ₹1,200.00\n")
+    assert data["vendor_name"] == "Acme Corp"
+    assert data["client_name"] == "Beta Ltd"
+    assert data["total_amount"] == 1200.0
+
+
+def test_canonical_label_wins_over_earlier_variant():
+    data = extract_invoice_data_from_text("Inv No: Z\nInvoice Number: REAL-1\n")
+    assert data["invoice_number"] == "REAL-1"
+
+
+def test_canonical_total_wins_over_earlier_amount_due():
+    data = extract_invoice_data_from_text("Amount Due 5.00\nAmount Due: 5.00\nTotal Amount 100.00\n")
+    assert data["total_amount"] == 100.0
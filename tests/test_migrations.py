@@ -0,0 +1,48 @@
+# tests/test_migrations.py
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from subagents.tools.migrations import MIGRATIONS, SESSIONS_MIGRATIONS, migrate, migrate_sessions, check_query_plans
+
+REPO_DATABASE = Path(__file__).resolve().parent.parent / "database.db"
+
+
+def _schema(conn: sqlite3.Connection) -> list:
+    return conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY type, name").fetchall()
+
+
+@pytest.fixture(params=["empty", "repository copy"])
+def database(request, tmp_path):
+    path = tmp_path / "database.db"
+    if request.param == "repository copy":
+        shutil.copy(REPO_DATABASE, path)
+    conn = sqlite3.connect(path)
+    yield conn
+    conn.close()
+
+
+def test_migrated_database_uses_its_indexes(database):
+    assert migrate(database) == MIGRATIONS[-1][0]
+    assert check_query_plans({"database": database}) == []
+
+
+def test_rerunning_migrations_is_a_no_op(database):
+    version = migrate(database)
+    schema, changes = _schema(database), database.total_changes
+
+    assert migrate(database) == version
+    assert _schema(database) == schema
+    assert database.total_changes == changes
+
+
+def test_migrated_sessions_use_their_indexes(tmp_path):
+    conn = sqlite3.connect(tmp_path / "sessions.db")
+    assert migrate_sessions(conn) == 0
+    conn.execute("CREATE TABLE events (id TEXT, session_id TEXT, timestamp TIMESTAMP, content TEXT)")
+    assert migrate_sessions(conn) == SESSIONS_MIGRATIONS[-1][0]
+    assert migrate_sessions(conn) == SESSIONS_MIGRATIONS[-1][0]
+    assert check_query_plans({"sessions": conn}) == []
+    conn.close()
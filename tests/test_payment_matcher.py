@@ -0,0 +1,28 @@
+# tests/test_payment_matcher.py
+import sqlite3
+
+from subagents.tools.migrations import migrate
+from subagents.tools.payment_matcher import match_unassigned_payments
+
+
+def test_rematched_proposal_waits_for_better_ones():
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+    invoices = [("INV-A", "Alpha Traders"), ("INV-B", "Beta Mills"), ("INV-C", "Gamma Works")]
+    conn.executemany("INSERT INTO invoices VALUES (?, '2025-01-01', '2025-01-31', ?, 'Client', 1000.0)", invoices)
+    conn.executemany(
+        "INSERT INTO reconciliation_results (run_id, invoice_number, vendor_name, claimed_total, amount_paid, "
+        "status, verdict, conclusion) VALUES ('run', ?, ?, 1000.0, NULL, 'DUE', 'UNPAID', '')", invoices
+    )
+    # T1 fits Alpha best (1.0) and Beta next (0.83); T2 fits Gamma (0.83) and, once T1 is gone, Beta (0.65).
+    conn.executemany("INSERT INTO bank_transactions VALUES (?, NULL, ?, '2025-01-10', 1000.0, 'DEBIT')", [
+        ("T1", "Alpha Traders Beta"),
+        ("T2", "Gamma payment"),
+    ])
+
+    matches = match_unassigned_payments(conn, "run", "2025-01-01", "2025-01-31")
+
+    assert {match["invoice_number"]: match["transaction_ids"] for match in matches} == {
+        "INV-A": ["T1"],
+        "INV-C": ["T2"],
+    }
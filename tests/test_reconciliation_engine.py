@@ -0,0 +1,20 @@
+# tests/test_reconciliation_engine.py
+import sqlite3
+
+import numpy as np
+
+from subagents.tools.reconciliation_engine import compute_verdicts, to_minor_units
+
+
+def test_minor_units_round_like_sqlite():
+    amounts = [10.125, 0.005, 2.5, 944000.0, 0.0]
+    conn = sqlite3.connect(":memory:")
+    expected = [conn.execute("SELECT CAST(ROUND(? * 100) AS INTEGER)", (amount,)).fetchone()[0] for amount in amounts]
+    assert to_minor_units(amounts).tolist() == expected
+
+
+def test_half_paisa_total_paid_in_full_is_verified():
+    # 10.125 is exactly representable: ROUND() in SQL gives 1013 paise, round-half-even would give 1012.
+    paid_minor = np.array([to_minor_units([10.125])[0]])
+    verdicts = compute_verdicts(np.array([10.125]), paid_minor, np.array([True]), tolerance_minor=0)
+    assert verdicts["verdict"].tolist() == ["VERIFIED"]
@@ -0,0 +1,111 @@
+# tests/test_write_queue.py
+import asyncio
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from subagents.tools import db_connections
+from subagents.tools.bank_statement_parser import DEFAULT_LAYOUT, parse_bank_statement_columns
+from subagents.tools.database_tools import save_bank_transaction_columns_queued, save_invoices_stream
+from subagents.tools.write_queue import WriteQueue, get_write_queue
+
+INSERT_SQL = "INSERT INTO invoices VALUES (?, ?, ?, ?, ?, ?)"
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_connections, "DATABASE_PATH", str(tmp_path / "database.db"))
+    yield db_connections.get_connection_manager()
+    db_connections.close_connection_manager()
+
+
+def test_threaded_submitters_filling_the_default_executor(database):
+    async def main():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=4))
+        queue = WriteQueue()
+        await queue.start()
+
+        def save(number: int) -> int:
+            # submit_threadsafe, with a bound on the wait so a stuck writer fails the test instead of hanging it.
+            rows = [(f"INV-{number}", "2025-01-01", "2025-02-01", "Acme", "Beta", 100.0)]
+            return asyncio.run_coroutine_threadsafe(queue.submit(INSERT_SQL, rows), loop).result(timeout=5)
+
+        try:
+            # More blocked submitters than the default executor has threads.
+            return await asyncio.gather(*(asyncio.to_thread(save, i) for i in range(16)), return_exceptions=True)
+        finally:
+            await queue.stop()
+
+    assert asyncio.run(main()) == [1] * 16
+    with database.read() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM invoices").fetchone()[0] == 16
+
+
+def test_failed_batch_does_not_stop_the_queue(database, monkeypatch):
+    async def main():
+        queue = WriteQueue()
+        await queue.start()
+        write_batch = queue._write_batch
+        def broken_once(batch):
+            monkeypatch.setattr(queue, "_write_batch", write_batch)
+            raise TypeError("bad row")
+        monkeypatch.setattr(queue, "_write_batch", broken_once)
+        try:
+            with pytest.raises(TypeError):
+                await asyncio.wait_for(queue.submit(INSERT_SQL, [("INV-1", "2025-01-01", "2025-02-01", "A", "B", 1.0)]), 5)
+            return await asyncio.wait_for(queue.submit(INSERT_SQL, [("INV-2", "2025-01-01", "2025-02-01", "A", "B", 1.0)]), 5)
+        finally:
+            await queue.stop()
+
+    assert asyncio.run(main()) == 1
+
+
+def test_threaded_stream_is_submitted_in_chunks(database):
+    async def main():
+        queue = get_write_queue()
+        await queue.start()
+        try:
+            invoices = [
+                {"invoice_number": f"INV-{i}", "invoice_date": "2025-01-01", "due_date": "2025-02-01",
+                 "vendor_name": "Acme", "client_name": "Beta", "total_amount": 100.0}
+                for i in range(5)
+            ]
+            requests_before = queue.requests
+            result = await asyncio.to_thread(save_invoices_stream, invoices, 2)
+            return result, queue.requests - requests_before
+        finally:
+            await queue.stop()
+
+    result, requests = asyncio.run(main())
+    assert result["inserted"] == 5
+    assert requests == 3
+
+
+def test_statement_columns_are_saved_through_the_queue(database):
+    pages = [
+        parse_bank_statement_columns("01-01-2025 TXN1 INV001 Payment one 1,000 5,000\n"
+                                     "02-01-2025 TXN2 INV002 Payment two 250 4,750"),
+        parse_bank_statement_columns("03-01-2025 TXN3 INV003 Payment three 50 4,700", DEFAULT_LAYOUT),
+    ]
+    # The pool worker sends the columns back to the API process.
+    pages = pickle.loads(pickle.dumps(pages))
+
+    async def main():
+        queue = get_write_queue()
+        await queue.start()
+        requests_before = queue.requests
+        try:
+            first = await save_bank_transaction_columns_queued(pages, 2)
+            again = await save_bank_transaction_columns_queued(pages, 2)
+            return first, again, queue.requests - requests_before
+        finally:
+            await queue.stop()
+
+    first, again, requests = asyncio.run(main())
+    assert (first["processed"], first["inserted"], first["ignored"]) == (3, 3, 0)
+    assert (again["inserted"], again["ignored"]) == (0, 3)
+    assert requests == 4
+    with database.read() as conn:
+        assert conn.execute("SELECT SUM(debit_amount) FROM bank_transactions").fetchone()[0] == 1300.0